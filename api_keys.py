@@ -0,0 +1,185 @@
+import os
+import json
+import hashlib
+import threading
+import http_client
+import metrics
+import response_cache
+from datetime import datetime, timezone
+
+# ================= KONFIGURACJA =================
+KEY_STATE_FILE = "key_state.json"
+KEY_NAMES = ["ODDS_KEY", "ODDS_KEY_1"] + [f"ODDS_KEY_{i}" for i in range(2, 11)]
+ODDS_API_URL = os.getenv("ODDS_API_URL", "https://api.the-odds-api.com/v4")   # podmiana np. na stub w bench_suite.py
+DEFAULT_QUOTA = 500        # darmowy plan The Odds API (limit miesięczny)
+COOLDOWN_SECONDS = 60      # przerwa dla klucza po 429 (zbyt wiele zapytań)
+
+def get_secret(name):
+    val = os.environ.get(name) or os.getenv(name)
+    return str(val).strip() if val else None
+
+def _fingerprint(key):
+    # Do pliku stanu trafia tylko skrót klucza - sam klucz zostaje w Secrets
+    return hashlib.sha256(key.encode()).hexdigest()[:8]
+
+def _month(ts=None):
+    t = datetime.fromtimestamp(ts, timezone.utc) if ts is not None else datetime.now(timezone.utc)
+    return t.strftime("%Y-%m")
+
+def _to_int(val):
+    try:
+        return int(float(val))
+    except (TypeError, ValueError):
+        return None
+
+class KeyManager:
+    """Pula kluczy The Odds API z limitami odczytanymi z nagłówków odpowiedzi.
+
+    Stan (pozostało/zużyto na klucz) trzymany jest w KEY_STATE_FILE, dzięki czemu
+    wyczerpane klucze pomijamy jeszcze przed wysłaniem zapytania.
+    """
+
+    def __init__(self, state_file=KEY_STATE_FILE):
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.keys = {}
+        seen = set()
+        for name in KEY_NAMES:
+            val = get_secret(name)
+            if val and val not in seen:
+                seen.add(val)
+                self.keys[name] = val
+        self.state = self._load()
+
+    def _load(self):
+        saved = {}
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except:
+                saved = {}
+
+        month = _month()
+        state = {}
+        for name, key in self.keys.items():
+            entry = saved.get(name, {})
+            # Nowy miesiąc albo podmieniony klucz = świeży limit
+            if entry.get("month") != month or entry.get("fp") != _fingerprint(key):
+                entry = self._fresh(name, month)
+            state[name] = entry
+        return state
+
+    def _fresh(self, name, month):
+        return {"fp": _fingerprint(self.keys[name]), "month": month,
+                "remaining": None, "used": None, "blocked_until": 0}
+
+    def _rollover(self, name, now):
+        """Proces żyjący przez przełom miesiąca (daemon.py): limit dostawcy się odnowił."""
+        month = _month(now)
+        if self.state[name].get("month") != month:
+            self.state[name] = self._fresh(name, month)
+
+    def save(self):
+        with self.lock:
+            data = dict(self.state)
+        with open(self.state_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        metrics.file_io("write", self.state_file)
+
+    def key(self, name):
+        return self.keys[name]
+
+    def budget(self, name):
+        remaining = self.state[name].get("remaining")
+        return DEFAULT_QUOTA if remaining is None else remaining
+
+    def total_budget(self, now=None):
+        """Suma pozostałego limitu wszystkich kluczy (z odnowieniem po przełomie miesiąca)."""
+        with self.lock:
+            now = now or datetime.now(timezone.utc).timestamp()
+            for name in self.keys:
+                self._rollover(name, now)
+            return sum(self.budget(name) for name in self.keys)
+
+    def is_available(self, name, now=None):
+        now = now or datetime.now(timezone.utc).timestamp()
+        self._rollover(name, now)
+        entry = self.state[name]
+        return self.budget(name) > 0 and entry.get("blocked_until", 0) <= now
+
+    def pick(self, exclude=()):
+        """Zwraca nazwę klucza z największym budżetem (lub None gdy brak żywych)."""
+        with self.lock:
+            now = datetime.now(timezone.utc).timestamp()
+            candidates = [n for n in self.keys if n not in exclude and self.is_available(n, now)]
+            if not candidates:
+                return None
+            return max(candidates, key=self.budget)
+
+    def report(self, name, resp):
+        """Aktualizuje stan klucza na podstawie odpowiedzi API."""
+        with self.lock:
+            entry = self.state[name]
+            remaining = _to_int(resp.headers.get("x-requests-remaining"))
+            used = _to_int(resp.headers.get("x-requests-used"))
+            if remaining is not None:
+                entry["remaining"] = remaining
+            if used is not None:
+                entry["used"] = used
+
+            if resp.status_code == 401:
+                # Zły klucz albo koniec kredytów - nie ruszamy go do końca miesiąca
+                entry["remaining"] = 0
+            elif resp.status_code == 429:
+                entry["blocked_until"] = datetime.now(timezone.utc).timestamp() + COOLDOWN_SECONDS
+
+    def summary(self):
+        return {name: {"remaining": e.get("remaining"), "used": e.get("used")}
+                for name, e in self.state.items()}
+
+def odds_request(km, path, params=None, timeout=15, log=None, use_cache=True):
+    """GET do The Odds API przez klucz z największym zapasem.
+
+    Zwraca (response, nazwa_klucza) albo (None, None) gdy żaden klucz nie zadziałał.
+    Trafienie w cache zwraca (CachedResponse, "cache") bez zużycia limitu.
+    """
+    out = log.append if log is not None else print
+    url = f"{ODDS_API_URL}/{path.lstrip('/')}"
+    tried = set()
+
+    cache = response_cache.get_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(path, params)
+        if cached is not None:
+            return cached, "cache"
+
+    while True:
+        name = km.pick(exclude=tried)
+        if not name:
+            if not tried:
+                out("  ⛔ Brak kluczy z dostępnym limitem.")
+            return None, None
+        tried.add(name)
+
+        # 429 nie ponawiamy na tym samym kluczu - szybciej przejść na kolejny
+        resp = http_client.get(url, params={**(params or {}), "apiKey": km.key(name)},
+                               timeout=timeout, retry_statuses=http_client.RETRY_STATUSES - {429})
+        if resp is None:
+            out(f"  📡 {name}... Błąd połączenia")
+            continue
+
+        km.report(name, resp)
+        # Koszt zapytania w jednostkach limitu (nagłówek x-requests-last) per klucz i liga
+        parts = path.strip("/").split("/")
+        metrics.add_quota(name, _to_int(resp.headers.get("x-requests-last")),
+                          parts[1] if len(parts) > 2 and parts[0] == "sports" else None)
+        if resp.status_code == 401:
+            out(f"  📡 {name}... Klucz wyczerpany/nieprawidłowy (401)")
+            continue
+        if resp.status_code == 429:
+            out(f"  📡 {name}... Limit klucza (429)")
+            continue
+        if cache is not None and resp.status_code == 200:
+            cache.put(path, params, resp.json())
+        return resp, name
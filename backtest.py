@@ -0,0 +1,230 @@
+import os
+import sys
+import json
+import heapq
+import itertools
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from odds_archive import OddsArchive
+from coupon_store import match_duration, parse_time
+from stats_engine import BASE_CAPITAL
+from storage import get_repository
+from value_engine import MAX_ODDS, MIN_BOOKMAKERS, MIN_ODDS, group_stats, pack_events
+from start import STAKE_RULES, get_smart_stake
+
+# Backtest reguł typowania i stawek na archiwum kursów (odds_archive) i rozliczonej historii
+# Użycie: python backtest.py [siatka.json]
+#
+# Ograniczenie: wyniki znamy tylko dla meczów, które bot faktycznie obstawił (historia),
+# mecze z archiwum bez wyniku są pomijane. Luźniejsze reguły niż produkcyjne oceniałyby
+# się więc tylko na zakładach wybranych starymi regułami - siatka jest ograniczona do
+# zaostrzeń (TIGHTEN), a konfiguracje luzujące którąś regułę są odrzucane.
+RESULTS_FILE = "backtest_results.json"
+WORKERS = int(os.getenv("BACKTEST_WORKERS", "0")) or os.cpu_count()
+LOOKAHEAD = timedelta(hours=48)      # jak max_future w start.py
+CURVE_POINTS = 50
+SELECTION = {"min_odds": MIN_ODDS, "max_odds": MAX_ODDS, "min_bookmakers": MIN_BOOKMAKERS}
+LIVE = dict(SELECTION, **STAKE_RULES)
+# Kierunek zaostrzenia reguły wyboru: +1 = wyższa wartość typuje mniej, -1 = niższa
+TIGHTEN = {"threshold": 1, "loss_threshold": 1, "loss_limit": 1, "hockey_discount": -1,
+           "min_odds": 1, "max_odds": -1, "min_bookmakers": 1}
+DEFAULT_GRID = {
+    "threshold": [1.035, 1.05, 1.07, 1.09],
+    "min_odds": [1.8, 2.0, 2.2],
+    "max_odds": [3.5, 4.0, 4.5],
+    "min_bookmakers": [3, 4, 5],
+    "loss_limit": [-700, -500, -300],
+}
+
+def load_results(history):
+    """id meczu -> (gole gospodarzy, gole gości) z rozliczonej historii."""
+    results = {}
+    for m in history:
+        try:
+            h, a = (int(x) for x in str(m.get('score', '')).split(":"))
+        except ValueError:
+            continue
+        results[m['id']] = (h, a)
+    return results
+
+def build_dataset(archive, results):
+    """Spłaszcza archiwum do tablic numpy: jeden wiersz = (odpowiedź, mecz, wynik).
+
+    Statystyki kursów (edge, kurs max, liczba bukmacherów) są liczone raz -
+    każda konfiguracja tylko filtruje te tablice.
+    """
+    cols = {k: [] for k in ("pair", "event", "league", "t", "finish", "edge", "odds", "count", "playable", "won")}
+    leagues, events = {}, {}
+    pairs = 0
+    for entry in sorted(archive.entries, key=lambda e: e["t"]):
+        fetched = parse_time(entry["t"])
+        kept = []
+        for event in archive.read(entry)["events"]:
+            start = parse_time(event.get('commence_time') or '')
+            if event.get('id') in results and start and fetched < start < fetched + LOOKAHEAD:
+                kept.append((event, start))
+        if not kept:
+            continue
+        packed = pack_events([e for e, _ in kept])
+        st = group_stats(packed)
+        league = leagues.setdefault(entry["league"], len(leagues))
+        finish_of = [(s + match_duration(entry["league"])).timestamp() for _, s in kept]
+        for g, name in enumerate(packed[3]):
+            i = int(st["group_event"][g])
+            event = kept[i][0]
+            h, a = results[event['id']]
+            cols["pair"].append(pairs + i)
+            cols["event"].append(events.setdefault(event['id'], len(events)))
+            cols["league"].append(league)
+            cols["t"].append(fetched.timestamp())
+            cols["finish"].append(finish_of[i])
+            cols["won"].append((name == event['home_team'] and h > a) or (name == event['away_team'] and a > h))
+        for key in ("edge", "count", "playable"):
+            cols[key].extend(st[key].tolist())
+        cols["odds"].extend(st["max_odd"].tolist())
+        pairs += len(kept)
+
+    data = {k: np.array(v) for k, v in cols.items()}
+    data["league_names"] = sorted(leagues, key=leagues.get)
+    data["n_pairs"] = pairs
+    data["n_events"] = len(events)
+    return data
+
+def candidates(data, sel, min_threshold):
+    """Najlepszy wynik w każdej parze (odpowiedź, mecz) - jak evaluate_packed, wektorowo."""
+    edge = data["edge"]
+    ok = (data["playable"] & (data["count"] >= sel["min_bookmakers"])
+          & (data["odds"] >= sel["min_odds"]) & (data["odds"] <= sel["max_odds"])
+          & (edge > 0) & (edge > min_threshold - 1))
+    cand = np.flatnonzero(ok)
+    if not len(cand):
+        return cand
+    pair = data["pair"][cand]
+    best = np.full(data["n_pairs"], -np.inf)
+    np.maximum.at(best, pair, edge[cand])
+    winners = cand[edge[cand] == best[pair]]
+    _, first = np.unique(data["pair"][winners], return_index=True)
+    return winners[first]       # rosnąco po parze = chronologicznie
+
+def _drawdown(curve):
+    peak = np.maximum.accumulate(curve)
+    return float((peak - curve).max()) if len(curve) else 0.0
+
+def run_config(cfg, data=None):
+    """Symulacja jednej konfiguracji: typy, stawki i rozliczenia w kolejności czasu."""
+    data = data if data is not None else _DATA
+    rules = dict(STAKE_RULES, **{k: v for k, v in cfg.items() if k in STAKE_RULES})
+    sel = dict(SELECTION, **{k: v for k, v in cfg.items() if k in SELECTION})
+    min_threshold = min(rules["threshold"], rules["loss_threshold"]) - max(0, rules["hockey_discount"]) - 1e-6
+
+    names = data["league_names"]
+    index = {}                    # symulowany league_stats.json
+    pending, placed = [], set()
+    bankroll, staked, wins, bets = BASE_CAPITAL, 0.0, 0, 0
+    curve = [bankroll]
+
+    def settle_until(t):
+        nonlocal bankroll, wins
+        while pending and pending[0][0] <= t:
+            _, _, league, profit, won = heapq.heappop(pending)
+            row = index.setdefault(league, {"profit": 0.0})
+            row["profit"] = round(row["profit"] + profit, 2)
+            bankroll += profit
+            wins += won
+            curve.append(bankroll)
+
+    cand = candidates(data, sel, min_threshold)
+    rows = zip(*(data[k][cand].tolist() for k in ("event", "league", "t", "finish", "edge", "odds", "won")))
+    for event, league, t, finish, edge, odds, won in rows:
+        if event in placed:
+            continue
+        settle_until(t)
+        league = names[league]
+        stake, threshold = get_smart_stake(league, index, rules)
+        if not edge > threshold - 1:
+            continue
+        profit = round(stake * odds - stake if won else -stake, 2)
+        placed.add(event)
+        heapq.heappush(pending, (finish, bets, league, profit, won))
+        staked += stake
+        bets += 1
+    settle_until(float("inf"))
+
+    curve = np.array(curve)
+    sample = np.unique(np.linspace(0, len(curve) - 1, CURVE_POINTS).astype(int))
+    profit = float(curve[-1] - BASE_CAPITAL)
+    return {
+        "config": cfg,
+        "bets": bets,
+        "wins": wins,
+        "staked": round(staked, 2),
+        "profit": round(profit, 2),
+        "yield": round(profit / staked * 100, 2) if staked else 0.0,
+        "max_drawdown": round(_drawdown(curve), 2),
+        "bankroll": round(float(curve[-1]), 2),
+        "curve": [round(float(x), 2) for x in curve[sample]],
+    }
+
+_DATA = None
+
+def _init_worker(data):
+    global _DATA
+    _DATA = data
+
+def loosened(cfg):
+    """Reguły wyboru, które konfiguracja luzuje względem produkcji (start.py/value_engine.py)."""
+    return [k for k, sign in TIGHTEN.items() if k in cfg and (cfg[k] - LIVE[k]) * sign < 0]
+
+def expand_grid(grid):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def sweep(data, configs, workers=WORKERS):
+    """Przeszukanie siatki w puli procesów (dane ładowane raz na proces)."""
+    if workers <= 1 or len(configs) < 2:
+        return [run_config(cfg, data) for cfg in configs]
+    chunk = max(1, len(configs) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+        return list(pool.map(run_config, configs, chunksize=chunk))
+
+def main():
+    grid = DEFAULT_GRID
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            grid = json.load(f)
+    configs = expand_grid(grid)
+    skipped = [cfg for cfg in configs if loosened(cfg)]
+    if skipped:
+        configs = [cfg for cfg in configs if not loosened(cfg)]
+        print(f"⚠️ Pominięto {len(skipped)} konfiguracji luzujących reguły ({', '.join(sorted({k for c in skipped for k in loosened(c)}))})"
+              f" - brak wyników meczów, których bot nie obstawił.")
+    if not configs:
+        print("ℹ️ Brak konfiguracji do sprawdzenia (dozwolone tylko zaostrzenia reguł).")
+        return
+
+    t0 = time.perf_counter()
+    archive = OddsArchive()
+    data = build_dataset(archive, load_results(get_repository().load_history()))
+    print(f"🧪 Dane: {len(archive.entries)} odpowiedzi /odds, {data['n_events']} meczów z wynikiem, "
+          f"{len(data['edge'])} kursów ({time.perf_counter() - t0:.1f} s)")
+    if not data["n_events"]:
+        print("ℹ️ Brak meczów z archiwum kursów, które mają wynik w historii.")
+        return
+
+    t0 = time.perf_counter()
+    results = sweep(data, configs)
+    results.sort(key=lambda r: r["profit"], reverse=True)
+    print(f"⚙️ {len(configs)} konfiguracji w {time.perf_counter() - t0:.1f} s (procesy: {WORKERS})")
+
+    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"generated": datetime.now().isoformat(timespec="seconds"), "grid": grid, "results": results}, f, indent=2)
+
+    print("🏆 Najlepsze konfiguracje:")
+    for r in results[:10]:
+        print(f"  {r['config']} | typów {r['bets']} | zysk {r['profit']:+.2f} PLN | yield {r['yield']}% | max DD {r['max_drawdown']:.2f}")
+    print(f"💾 Wszystkie wyniki z krzywymi kapitału: {RESULTS_FILE}")
+
+if __name__ == "__main__":
+    main()
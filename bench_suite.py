@@ -0,0 +1,358 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import resource
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Benchmark etapów bota na syntetycznych danych - offline, z lokalną atrapą
+# The Odds API i Telegrama. Każdy etap w osobnym procesie, na świeżej kopii danych.
+# Użycie: python bench_suite.py [rozmiar_historii ...] [--save]
+#   np. python bench_suite.py 10000 100000 1000000
+BASELINE_FILE = "bench_baseline.json"
+DEFAULT_SIZES = [10000, 100000]
+COUPONS = 1000                 # otwarte kupony (część do rozliczenia, część przeterminowana)
+EVENTS_PER_LEAGUE = 30         # mecze w odpowiedzi /odds
+BOOKMAKERS = 20
+HISTORY_SPAN = timedelta(days=730)
+STAKE_CALLS = 100000           # wywołania get_smart_stake w etapie smart_stake
+REPEAT = 3                     # powtórzenia etapu - liczy się najlepszy czas (mniej szumu)
+REGRESSION_RATIO = 1.25        # wolniej / więcej pamięci niż baseline x tyle = regresja
+SEED = 42
+STAGES = ["scan", "settle", "report", "stats", "full_report", "league_index", "smart_stake"]
+RESULT_PREFIX = "BENCH_RESULT "
+
+TEAMS = ["Lions", "Tigers", "Eagles", "Wolves", "Bears", "Sharks", "Falcons", "Rangers",
+         "United", "City", "Rovers", "Athletic", "Sporting", "Dynamo", "Olympic", "Royals"]
+
+def _event_id(*parts):
+    return hashlib.md5(":".join(str(p) for p in parts).encode()).hexdigest()
+
+def _iso(t):
+    return t.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+# ================= GENERATORY DANYCH =================
+def _teams(rng):
+    home, away = rng.sample(TEAMS, 2)
+    return f"{home} {rng.randint(1, 40)}", f"{away} {rng.randint(1, 40)}"
+
+def history_records(size, leagues, now, seed=SEED):
+    """Rozliczone zakłady (jak z settle.py) + co jakiś czas wpłata FINANCE."""
+    rng = random.Random(seed)
+    step = HISTORY_SPAN / size
+    start = now - HISTORY_SPAN
+    for i in range(size):
+        t = start + step * i
+        if i % 5000 == 0:
+            yield {"id": f"dep_{i}", "home": "WPŁATA", "away": "KAPITAŁ", "outcome": "-", "odds": 1.0,
+                   "stake": 0, "profit": 1000.0, "sport": "FINANCE", "status": "DEPOSIT", "time": t.isoformat()}
+            continue
+        home, away = _teams(rng)
+        odds = round(rng.uniform(1.6, 4.5), 2)
+        stake = rng.choice([125.0, 250.0, 325.0, 400.0])
+        won = rng.random() < 1 / odds * 1.04
+        h, a = (rng.randint(1, 4), rng.randint(0, 2)) if won else (rng.randint(0, 1), rng.randint(2, 4))
+        yield {"id": _event_id("h", seed, i), "home": home, "away": away, "outcome": home,
+               "odds": odds, "stake": stake, "sport": rng.choice(leagues), "time": _iso(t),
+               "profit": round(stake * odds - stake if won else -stake, 2),
+               "status": "WIN" if won else "LOSS", "score": f"{h}:{a}"}
+
+def write_history(path, size, leagues, now):
+    """Zapis strumieniowy (bez trzymania 1M rekordów w pamięci), format jak atomic_write_json."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for m in history_records(size, leagues, now):
+            body = json.dumps(m, indent=4, ensure_ascii=False).replace("\n", "\n    ")
+            f.write(("," if count else "") + "\n    " + body)
+            count += 1
+        f.write("\n]")
+    return count
+
+def coupons(count, leagues, now, seed=SEED):
+    """Otwarte kupony: ~60% już po meczu, ~30% przed startem, ~10% poza oknem /scores."""
+    rng = random.Random(seed + 1)
+    result = []
+    for i in range(count):
+        r = rng.random()
+        if r < 0.6:
+            t = now - timedelta(hours=rng.uniform(4, 60))
+        elif r < 0.9:
+            t = now + timedelta(hours=rng.uniform(1, 48))
+        else:
+            t = now - timedelta(days=rng.uniform(4, 10))
+        home, away = _teams(rng)
+        result.append({"id": _event_id("c", seed, i), "home": home, "away": away,
+                       "outcome": rng.choice([home, away]), "odds": round(rng.uniform(1.6, 4.5), 2),
+                       "stake": 250.0, "sport": rng.choice(leagues), "time": _iso(t)})
+    return result
+
+def odds_payload(league, now, seed=SEED):
+    """Odpowiedź /odds jednej ligi: kursy bukmacherów wokół wspólnej 'prawdziwej' ceny."""
+    rng = random.Random(f"{seed}:{league}")
+    events = []
+    for i in range(EVENTS_PER_LEAGUE):
+        home, away = _teams(rng)
+        names = [home, away] + (["Draw"] if league.startswith("soccer") else [])
+        base = {name: rng.uniform(1.6, 4.5) for name in names}
+        books = []
+        for b in range(BOOKMAKERS):
+            # Zwykle zgodne ceny, czasem jeden bukmacher odstaje - wtedy pojawia się value
+            outcomes = [{"name": name, "price": round(base[name] * rng.uniform(0.97, 1.01)
+                                                      * (1.07 if rng.random() < 0.002 else 1), 2)} for name in names]
+            books.append({"key": f"book{b}", "markets": [{"key": "h2h", "outcomes": outcomes}]})
+        events.append({"id": _event_id("o", league, i), "sport_key": league, "home_team": home, "away_team": away,
+                       "commence_time": _iso(now + timedelta(hours=rng.uniform(1, 60))), "bookmakers": books})
+    return events
+
+def score(coupon, seed=SEED):
+    rng = random.Random(f"{seed}:{coupon['id']}")
+    return {"id": coupon['id'], "sport_key": coupon['sport'], "completed": True,
+            "home_team": coupon['home'], "away_team": coupon['away'],
+            "scores": [{"name": coupon['home'], "score": str(rng.randint(0, 4))},
+                       {"name": coupon['away'], "score": str(rng.randint(0, 4))}]}
+
+# ================= ATRAPA API =================
+class StubApi:
+    """The Odds API (/v4/sports/<liga>/odds|events|scores) i Telegram (/bot<token>/sendMessage) na localhost."""
+
+    def __init__(self, leagues, open_coupons, now):
+        payloads = {league: odds_payload(league, now) for league in leagues}
+        self.odds = {league: json.dumps(events).encode() for league, events in payloads.items()}
+        self.events = {league: json.dumps([{k: v for k, v in e.items() if k != "bookmakers"} for e in events]).encode()
+                       for league, events in payloads.items()}
+        self.scores = {c['id']: score(c) for c in open_coupons}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"     # keep-alive jak z prawdziwym API
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code, body):
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("x-requests-remaining", "10000")
+                self.send_header("x-requests-used", "0")
+                self.send_header("x-requests-last", "1")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with api.lock:
+                    api.requests += 1
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")      # v4 / sports / <liga> / odds|events|scores
+                if len(parts) == 4 and parts[3] == "odds" and parts[2] in api.odds:
+                    return self._send(200, api.odds[parts[2]])
+                if len(parts) == 4 and parts[3] == "events" and parts[2] in api.events:
+                    return self._send(200, api.events[parts[2]])
+                if len(parts) == 4 and parts[3] == "scores":
+                    ids = parse_qs(url.query).get("eventIds", [""])[0].split(",")
+                    found = [api.scores[i] for i in ids if i in api.scores]
+                    return self._send(200, json.dumps(found).encode())
+                self._send(404, b'{"message": "not found"}')
+
+            def do_POST(self):
+                with api.lock:
+                    api.requests += 1
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.path.endswith("/sendMessage"):
+                    return self._send(200, b'{"ok": true, "result": {"message_id": 1}}')
+                self._send(404, b'{"ok": false}')
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="bench-stub", daemon=True)
+        self.thread.start()
+        return self
+
+    def take_requests(self):
+        with self.lock:
+            n, self.requests = self.requests, 0
+        return n
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# ================= ETAPY (w procesie potomnym, cwd = kopia danych) =================
+def _stage_functions():
+    import settle
+    import history_store
+    import stats
+    import full_report
+    import league_index
+    import start
+
+    def smart_stake():
+        index = league_index.load_index()
+        leagues = list(start.SPORTS_CONFIG)
+        for i in range(STAKE_CALLS):
+            start.get_smart_stake(leagues[i % len(leagues)], index)
+
+    def prepare():
+        # Stan jak w repozytorium: historia w partycjach, punkt kontrolny statystyk i indeks lig już istnieją
+        history_store.migrate()
+        settle.generate_report(0, full=True)
+        league_index.rebuild_index()
+
+    return {
+        "prepare": prepare,
+        "scan": start.main,
+        "settle": settle.settle_matches,
+        "report": lambda: settle.generate_report(0, full=True),
+        "stats": stats.generate_stats,
+        "full_report": full_report.generate_report,
+        "league_index": league_index.rebuild_index,
+        "smart_stake": smart_stake,
+    }
+
+def run_stage(name):
+    fn = _stage_functions()[name]       # importy poza pomiarem czasu
+    t0 = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - t0
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(RESULT_PREFIX + json.dumps({"seconds": round(seconds, 3), "peak_mb": round(peak_kb / 1024, 1)}))
+
+# ================= PRZEBIEG =================
+def _child_env(stub):
+    env = {k: v for k, v in os.environ.items() if not k.startswith("ODDS_KEY") and k != "STORAGE_DB"}
+    env.update({
+        "ODDS_API_URL": f"{stub.url}/v4",
+        "TELEGRAM_API": stub.url,
+        "ODDS_KEY": "bench-key",
+        "T_TOKEN": "bench-token",
+        "T_CHAT": "1",
+        "API_CACHE": "0",
+        "TG_CHAT_INTERVAL": "0",
+        "STORAGE": "json",
+        "NO_PROXY": "127.0.0.1,localhost",
+        "no_proxy": "127.0.0.1,localhost",
+    })
+    return env
+
+def _run_child(stage, workdir, env):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--stage", stage],
+                          cwd=workdir, env=env, capture_output=True, text=True)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    tail = "\n".join((proc.stdout + proc.stderr).strip().splitlines()[-15:])
+    raise RuntimeError(f"etap {stage} nie zakończył się poprawnie (kod {proc.returncode}):\n{tail}")
+
+def bench_size(size, root):
+    from start import SPORTS_CONFIG
+    leagues = list(SPORTS_CONFIG)
+    now = datetime.now(timezone.utc)
+    template = os.path.join(root, f"template_{size}")
+    os.makedirs(template)
+
+    t0 = time.perf_counter()
+    path = os.path.join(template, "history.json")
+    count = write_history(path, size, leagues, now)
+    with open(os.path.join(template, "history_meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"generation": 0, "snapshot_count": count, "snapshot_size": os.path.getsize(path)}, f)
+    history_mb = os.path.getsize(path) / 1024 / 1024
+    open_coupons = coupons(COUPONS, leagues, now)
+    with open(os.path.join(template, "coupons.json"), "w", encoding="utf-8") as f:
+        json.dump(open_coupons, f, indent=4)
+
+    stub = StubApi(leagues, open_coupons, now).start()
+    env = _child_env(stub)
+    results = {}
+    try:
+        _run_child("prepare", template, env)
+        print(f"📦 {size} rekordów historii ({history_mb:.0f} MB), "
+              f"{COUPONS} kuponów - przygotowanie {time.perf_counter() - t0:.1f} s")
+        for stage in STAGES:
+            runs = []
+            for n in range(REPEAT):
+                workdir = os.path.join(root, f"run_{size}_{stage}_{n}")
+                shutil.copytree(template, workdir)
+                stub.take_requests()
+                runs.append(dict(_run_child(stage, workdir, env), requests=stub.take_requests()))
+                shutil.rmtree(workdir)
+            results[stage] = min(runs, key=lambda r: r["seconds"])
+    finally:
+        stub.close()
+        shutil.rmtree(template)
+    return results
+
+def _load_baseline():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    try:
+        with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f).get("results", {})
+    except:
+        return {}
+
+def compare(size, results, baseline):
+    """Wypisuje wyniki z porównaniem do baseline. Zwraca liczbę regresji."""
+    regressions = 0
+    for stage, r in results.items():
+        base = baseline.get(str(size), {}).get(stage)
+        note = ""
+        if base:
+            dt, dm = r["seconds"] / max(base["seconds"], 1e-3), r["peak_mb"] / max(base["peak_mb"], 1e-3)
+            slow = dt > REGRESSION_RATIO and r["seconds"] - base["seconds"] > 0.05
+            fat = dm > REGRESSION_RATIO
+            regressions += slow or fat
+            note = f" | vs baseline: czas x{dt:.2f}, pamięć x{dm:.2f}{' ⚠️ REGRESJA' if slow or fat else ''}"
+        print(f"  {stage:<13} {r['seconds']:>8.3f} s | szczyt RSS {r['peak_mb']:>7.1f} MB | zapytań HTTP {r['requests']:>4}{note}")
+    return regressions
+
+def main(args):
+    save = "--save" in args
+    sizes = [int(a) for a in args if a.isdigit()] or DEFAULT_SIZES
+    baseline = _load_baseline()
+    root = tempfile.mkdtemp(prefix="bench_suite_")
+    all_results, regressions = {}, 0
+    try:
+        for size in sizes:
+            results = bench_size(size, root)
+            all_results[str(size)] = results
+            regressions += compare(size, results, baseline)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if save:
+        merged = dict(baseline, **all_results)
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"saved": datetime.now().isoformat(timespec="seconds"), "results": merged}, f, indent=2)
+        print(f"💾 Baseline zapisany: {BASELINE_FILE}")
+    elif not baseline:
+        print(f"ℹ️ Brak baseline - zapisz go: python bench_suite.py {' '.join(map(str, sizes))} --save")
+    if regressions:
+        print(f"⚠️ Regresje względem baseline: {regressions}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--stage":
+        run_stage(sys.argv[2])
+    else:
+        sys.exit(main(sys.argv[1:]))
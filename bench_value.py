@@ -0,0 +1,65 @@
+import sys
+import time
+import random
+from value_engine import best_value_loop, collect_prices, evaluate_events, evaluate_packed, pack_events
+
+# Mikro-benchmark: pętla w Pythonie vs value_engine na syntetycznych odpowiedziach /odds
+# Użycie: python bench_value.py [liczba_meczów] [liczba_bukmacherów]
+
+def synthetic_events(n_events, n_books, seed=42):
+    rng = random.Random(seed)
+    events = []
+    for i in range(n_events):
+        names = ["Home", "Away"] + (["Draw"] if rng.random() < 0.6 else [])
+        base = {name: rng.uniform(1.5, 5.0) for name in names}
+        books = []
+        for _ in range(n_books):
+            if rng.random() < 0.1:
+                continue  # bukmacher bez kursów na ten mecz
+            outcomes = [{"name": name, "price": round(base[name] * rng.uniform(0.9, 1.12), 2)}
+                        for name in names if rng.random() > 0.05]
+            books.append({"markets": [{"key": "h2h", "outcomes": outcomes}]})
+        events.append({"id": f"ev{i}", "home_team": "Home", "away_team": "Away", "bookmakers": books})
+    return events
+
+EDGE_TOLERANCE = 1e-9
+
+def _same(loop_picks, vec_picks):
+    """Te same typy i kursy, edge z tolerancją na zaokrąglenia sumy."""
+    return len(loop_picks) == len(vec_picks) and all(
+        (a is None and b is None) or (a is not None and b is not None and a[:2] == b[:2]
+                                      and abs(a[2] - b[2]) <= EDGE_TOLERANCE)
+        for a, b in zip(loop_picks, vec_picks))
+
+def _best(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t)
+    return best, result
+
+def bench(n_events, n_books, threshold=1.035, repeat=3):
+    events = synthetic_events(n_events, n_books)
+
+    loop_t, loop_picks = _best(lambda: [best_value_loop(e, threshold) for e in events], repeat)
+    vec_t, vec_picks = _best(lambda: evaluate_events(events, threshold), repeat)
+    # Rozbicie: sam odczyt JSON (wspólny dla obu metod) vs część obliczeniowa
+    walk_t, _ = _best(lambda: [collect_prices(e) for e in events], repeat)
+    packed = pack_events(events)
+    math_t, _ = _best(lambda: evaluate_packed(packed, len(events), threshold), repeat)
+
+    same = _same(loop_picks, vec_picks)
+    found = sum(1 for p in vec_picks if p)
+    print(f"{n_events:>6} x {n_books:>2} buk. | pętla {loop_t*1000:7.1f} ms "
+          f"(w tym odczyt JSON {walk_t*1000:7.1f} ms) | numpy {vec_t*1000:7.1f} ms "
+          f"(obliczenia {math_t*1000:6.1f} ms) | typów {found:>5} | zgodne: {'✅' if same else '❌'}")
+    return same
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        sizes = [(int(sys.argv[1]), int(sys.argv[2]))]
+    else:
+        sizes = [(50, 20), (1000, 30), (10000, 40), (50000, 40)]
+    ok = all(bench(n, b) for n, b in sizes)
+    sys.exit(0 if ok else 1)
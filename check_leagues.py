@@ -1,41 +1,31 @@
-import os
-import requests
-
-def get_secret(name):
-    val = os.environ.get(name) or os.getenv(name)
-    return str(val).strip() if val else None
+import response_cache
+from api_keys import KeyManager, odds_request
 
 def check_everything():
     print("=== START DIAGNOSTYKI API ===")
     
-    # 1. Sprawdzanie zużycia kluczy
-    for i in range(1, 11):
-        name = "ODDS_KEY" if i == 1 else f"ODDS_KEY_{i}"
-        key = get_secret(name)
-        if not key: continue
-        
-        url = "https://api.the-odds-api.com/v4/sports"
-        try:
-            r = requests.get(url, params={"apiKey": key}, timeout=10)
-            rem = r.headers.get('x-requests-remaining', '0')
-            if r.status_code == 200:
-                print(f"✅ {name}: OK (Pozostało: {rem})")
-            else:
-                print(f"❌ {name}: Błąd {r.status_code} ({r.text[:50]})")
-        except:
-            print(f"💥 {name}: Błąd połączenia")
+    # 1. Sprawdzanie zużycia kluczy (ze stanu zapisanego przez bota - bez zużywania limitu)
+    km = KeyManager()
+    for name in km.keys:
+        rem = km.state[name].get('remaining')
+        if not km.is_available(name):
+            print(f"⛔ {name}: wyczerpany / zablokowany (Pozostało: {rem})")
+        else:
+            print(f"✅ {name}: OK (Pozostało: {'?' if rem is None else rem})")
 
     print("\n=== LISTA DOSTĘPNYCH LIG ===")
-    # 2. Pobieranie nazw lig (z pierwszego działającego klucza)
-    api_key = get_secret("ODDS_KEY") or get_secret("ODDS_KEY_1")
-    if api_key:
-        try:
-            resp = requests.get("https://api.the-odds-api.com/v4/sports", params={"apiKey": api_key})
-            if resp.status_code == 200:
-                for l in resp.json():
-                    if any(x in l['key'] for x in ["soccer", "icehockey"]):
-                        print(f"KEY: {l['key']} | TITLE: {l['title']}")
-        except: pass
+    # 2. Pobieranie nazw lig (z klucza o największym zapasie)
+    try:
+        resp, name = odds_request(km, "sports", timeout=10)
+        if resp is not None and resp.status_code == 200:
+            print(f"(źródło: {name}, pozostało: {km.budget(name) if name in km.keys else '-'})")
+            for l in resp.json():
+                if any(x in l['key'] for x in ["soccer", "icehockey"]):
+                    print(f"KEY: {l['key']} | TITLE: {l['title']}")
+    except Exception as e:
+        print(f"💥 Błąd połączenia: {e}")
+    km.save()
+    response_cache.save()
 
 if __name__ == "__main__":
     check_everything()
@@ -1,12 +1,13 @@
-import json
+from league_index import rebuild_index
+from storage import get_repository
 
 def remove_nba():
-    file_name = 'history.json'
-    
     try:
         # 1. Wczytaj dane
-        with open(file_name, 'r', encoding='utf-8') as f:
-            history = json.load(f)
+        repo = get_repository()
+        history = repo.load_history()
+        if not history:
+            raise FileNotFoundError
         
         original_count = len(history)
         
@@ -20,14 +21,14 @@ def remove_nba():
         removed_count = original_count - len(clean_history)
         
         # 3. Zapisz poprawiony plik
-        with open(file_name, 'w', encoding='utf-8') as f:
-            json.dump(clean_history, f, indent=4, ensure_ascii=False)
+        repo.write_history(clean_history)
+        rebuild_index(clean_history)
             
         print(f"✅ Gotowe! Usunięto {removed_count} rekordów NBA.")
         print(f"📄 Pozostało meczów w historii: {len(clean_history)}")
         
     except FileNotFoundError:
-        print("❌ Błąd: Nie znaleziono pliku history.json")
+        print("❌ Błąd: Nie znaleziono historii (history/)")
     except Exception as e:
         print(f"❌ Wystąpił błąd: {e}")
 
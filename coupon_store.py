@@ -0,0 +1,163 @@
+import os
+import json
+import bisect
+import metrics
+from datetime import datetime, timezone, timedelta
+
+# Kupony w pamięci z indeksami: po id (czy typ już wysłany - O(1)) oraz po czasie
+# startu i spodziewanego końca meczu (co już do rozliczenia - O(log n)).
+# Kupony starsze niż okno /scores nie rozliczą się same - trafiają do archiwum
+# nierozliczonych (ARCHIVE_FILE), a coupons.json trzyma tylko żywe kupony.
+SCORES_DAYS_FROM = 3           # maksymalne okno /scores?daysFrom w The Odds API
+SETTLE_WINDOW = timedelta(days=SCORES_DAYS_FROM)
+ARCHIVE_FILE = "stale_coupons.json"     # rozlicza je: python fix_history.py stale
+MATCH_DURATION = {             # czas od rozpoczęcia do spodziewanego końca meczu
+    "soccer": timedelta(hours=2, minutes=15),
+    "icehockey": timedelta(hours=3),
+    "basketball": timedelta(hours=2, minutes=45),
+}
+DEFAULT_DURATION = timedelta(hours=3)
+
+def parse_time(t_str):
+    try:
+        return datetime.fromisoformat(t_str.replace("Z", "+00:00"))
+    except:
+        return None
+
+def match_duration(sport):
+    return MATCH_DURATION.get((sport or "").split("_")[0], DEFAULT_DURATION)
+
+def expected_finish(coupon):
+    start = parse_time(coupon.get('time') or '')
+    return start + match_duration(coupon.get('sport')) if start else None
+
+class CouponStore:
+    """Aktywne kupony: słownik id -> kupon (kolejność dodania) + posortowane indeksy czasu.
+
+    Indeksy to listy (timestamp, nr, id) utrzymywane przez bisect. Usunięte albo
+    nadpisane kupony zostają w indeksach do czasu przebudowy i są pomijane przy
+    odczycie (nr wpisu nie zgadza się z aktualnym).
+    """
+
+    def __init__(self, coupons=()):
+        self.by_id = {}
+        self._entry = {}        # id -> nr aktualnego wpisu w indeksach
+        self._finish = []       # (spodziewany koniec, nr, id)
+        self._start = []        # (start, nr, id)
+        self._untimed = {}      # id -> nr - kupony bez czasu (zawsze do sprawdzenia)
+        self._seq = 0
+        for coupon in coupons:
+            self.add(coupon)
+
+    def __contains__(self, coupon_id):
+        return coupon_id in self.by_id
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(list(self.by_id.values()))
+
+    def coupons(self):
+        return list(self.by_id.values())
+
+    def add(self, coupon):
+        """Dodaje kupon; ten sam id zastępuje poprzedni (na jego miejscu w kolejności)."""
+        coupon_id = coupon['id']
+        self._seq += 1
+        self.by_id[coupon_id] = coupon
+        self._entry[coupon_id] = self._seq
+        self._untimed.pop(coupon_id, None)
+        start = parse_time(coupon.get('time') or '')
+        if start is None:
+            self._untimed[coupon_id] = self._seq
+            return
+        finish = start + match_duration(coupon.get('sport'))
+        bisect.insort(self._start, (start.timestamp(), self._seq, coupon_id))
+        bisect.insort(self._finish, (finish.timestamp(), self._seq, coupon_id))
+
+    def remove(self, ids):
+        """Usuwa kupony o podanych id, zwraca usunięte."""
+        removed = []
+        for coupon_id in ids:
+            coupon = self.by_id.pop(coupon_id, None)
+            if coupon is not None:
+                removed.append(coupon)
+                self._entry.pop(coupon_id)
+                self._untimed.pop(coupon_id, None)
+        if len(self._finish) > 2 * len(self.by_id) + 64:
+            self._rebuild()
+        return removed
+
+    def _rebuild(self):
+        coupons = self.coupons()
+        self.__init__(coupons)
+
+    def _live(self, index, hi):
+        for ts, seq, coupon_id in index[:hi]:
+            if self._entry.get(coupon_id) == seq:
+                yield coupon_id
+
+    def due(self, now=None):
+        """Kupony, których mecz powinien się już skończyć (rosnąco po końcu) + kupony bez czasu."""
+        now = now or datetime.now(timezone.utc)
+        hi = bisect.bisect_right(self._finish, (now.timestamp(), float("inf")))
+        untimed = [self.by_id[coupon_id] for coupon_id in self._untimed]
+        return untimed + [self.by_id[coupon_id] for coupon_id in self._live(self._finish, hi)]
+
+    def by_finish(self):
+        """Kupony z czasem, rosnąco po spodziewanym końcu meczu."""
+        return [self.by_id[coupon_id] for coupon_id in self._live(self._finish, len(self._finish))]
+
+    def started_before(self, t):
+        hi = bisect.bisect_left(self._start, (t.timestamp(),))
+        return [self.by_id[coupon_id] for coupon_id in self._live(self._start, hi)]
+
+    def expired(self, now=None):
+        """Kupony poza oknem /scores - API już nie zwróci ich wyniku."""
+        return self.started_before((now or datetime.now(timezone.utc)) - SETTLE_WINDOW)
+
+    def next_finish(self, after=None):
+        """Najbliższy spodziewany koniec meczu (po `after`, jeśli podany) albo None."""
+        lo = bisect.bisect_right(self._finish, (after.timestamp(), float("inf"))) if after else 0
+        for ts, seq, coupon_id in self._finish[lo:]:
+            if self._entry.get(coupon_id) == seq:
+                return datetime.fromtimestamp(ts, timezone.utc)
+        return None
+
+    def expire(self, now=None):
+        """Przenosi kupony poza oknem /scores do archiwum. Zwraca liczbę przeniesionych."""
+        expired = self.remove([c['id'] for c in self.expired(now)])
+        if expired:
+            total = archive_coupons(expired)
+            print(f"🧰 Przeniesiono {len(expired)} kuponów do {ARCHIVE_FILE} (razem: {total}) - rozlicza je: python fix_history.py stale")
+        return len(expired)
+
+# ================= ARCHIWUM NIEROZLICZONYCH =================
+def load_archive():
+    if not os.path.exists(ARCHIVE_FILE):
+        return []
+    try:
+        with open(ARCHIVE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return []
+
+def save_archive(coupons):
+    with open(ARCHIVE_FILE, "w", encoding="utf-8") as f:
+        json.dump(coupons, f, indent=4, ensure_ascii=False)
+    metrics.file_io("write", ARCHIVE_FILE)
+
+def archive_coupons(coupons):
+    """Dopisuje kupony do archiwum (bez duplikatów po id). Zwraca rozmiar archiwum."""
+    current = load_archive()
+    known = {c['id'] for c in current}
+    current.extend(c for c in coupons if c['id'] not in known)
+    save_archive(current)
+    return len(current)
+
+if __name__ == "__main__":
+    # Podgląd: ile kuponów żywych, do rozliczenia i przeterminowanych (bez zmian w plikach)
+    from storage import get_repository
+    store = CouponStore(get_repository().load_coupons())
+    print(f"Aktywne: {len(store)} | do rozliczenia: {len(store.due())} | poza oknem /scores: {len(store.expired())} | archiwum: {len(load_archive())}")
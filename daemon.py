@@ -0,0 +1,189 @@
+import os
+import signal
+import asyncio
+import metrics
+import response_cache
+from datetime import datetime, timezone, timedelta
+from api_keys import KeyManager
+from league_index import load_index
+from odds_archive import get_recorder
+from scan_scheduler import FixtureCalendar
+from coupon_store import CouponStore
+from storage import CachedRepository, get_repository
+from telegram_outbox import Outbox
+from start import SPORTS_CONFIG, fetch_league_odds, league_tips
+import settle
+
+# Tryb ciągły (jeden mały serwer zamiast crona w GitHub Actions): stan w pamięci,
+# pętla asyncio z osobnym zegarem na każdą ligę i zegarem rozliczeń.
+# Limit kluczy: odstęp /odds ligi liczony z zapasu limitu do końca miesiąca (refresh_interval),
+# kupony bez wyniku (np. przełożony mecz) sprawdzane coraz rzadziej (SETTLE_BACKOFF_MAX).
+# Użycie: python daemon.py   (zatrzymanie: SIGTERM / Ctrl+C - stan zapisany przed wyjściem)
+POLL_INTERVAL = int(os.getenv("DAEMON_POLL", "900"))          # sekundy między sprawdzeniami ligi (min. odstęp /odds)
+SETTLE_RETRY = int(os.getenv("DAEMON_SETTLE_RETRY", "900"))   # pierwsza ponowna próba, gdy wyniku jeszcze nie ma
+SETTLE_BACKOFF_MAX = 6 * 3600                                 # kolejne próby co 2x dłużej, najwyżej co tyle
+SETTLE_RESERVE = 0.2                                          # część limitu zostawiona na /scores
+SETTLE_MAX_WAIT = 3600                                        # najdłuższa przerwa między rozliczeniami
+SAVE_DEBOUNCE = int(os.getenv("DAEMON_SAVE_DEBOUNCE", "30"))  # zmiany z tego okna zapisujemy jednym zapisem
+
+async def _sleep(stop, seconds):
+    """Czekanie przerywane sygnałem zatrzymania."""
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=max(0, seconds))
+    except asyncio.TimeoutError:
+        pass
+
+class Daemon:
+    """Kupony, historia, klucze i terminarz w pamięci; zapis na dysk z opóźnieniem (debounce)."""
+
+    def __init__(self):
+        self.km = KeyManager()
+        self.repo = CachedRepository(get_repository())
+        self.index = load_index()
+        self.calendar = FixtureCalendar()
+        self.store = CouponStore(self.repo.load_coupons())     # typy wysłane + indeks czasu rozliczeń
+        self.outbox = Outbox()
+        self.recorder = get_recorder()
+        self.lock = None        # asyncio.Lock - tworzony w pętli
+        self.stop = None
+        self.dirty = None
+        self.tips = 0
+        self.backoff = {}       # id kuponu -> (nieudane próby, najbliższa próba)
+
+    # --- zapis ---
+    def _save(self):
+        self.repo.flush()
+        self.calendar.save()
+        self.km.save()
+        response_cache.save()
+        metrics.write()
+
+    async def saver(self):
+        """Debounce: pierwsza zmiana uruchamia odliczanie, wszystko z tego okna idzie jednym zapisem."""
+        while not self.stop.is_set():
+            await self.dirty.wait()
+            await _sleep(self.stop, SAVE_DEBOUNCE)
+            if self.stop.is_set():
+                return          # ostatni zapis robi shutdown()
+            async with self.lock:
+                self.dirty.clear()
+                await asyncio.to_thread(self._save)
+
+    # --- ligi ---
+    def refresh_interval(self, now):
+        """Odstęp /odds jednej ligi, przy którym limit kluczy wystarczy do końca miesiąca."""
+        month_end = (now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) + timedelta(days=32)).replace(day=1)
+        budget = self.km.total_budget(now.timestamp()) * (1 - SETTLE_RESERVE)
+        seconds = (month_end - now).total_seconds() * len(SPORTS_CONFIG) / max(1.0, budget)
+        return timedelta(seconds=max(POLL_INTERVAL, seconds))
+
+    async def poll_league(self, league, offset):
+        await _sleep(self.stop, offset)     # rozłożenie startu lig w czasie
+        while not self.stop.is_set():
+            now = datetime.now(timezone.utc)
+            if self.calendar.needs_events(league, now):
+                # Zapytanie w wątku, zmiana terminarza pod blokadą (saver serializuje go w _save)
+                events = await asyncio.to_thread(self.calendar.fetch_events, league, self.km)
+                if events is not None:
+                    async with self.lock:
+                        self.calendar.record_events(league, events, now)
+            reason = self.calendar.decide(league, self.store, now, refresh_after=self.refresh_interval(now))
+            if reason is None:
+                await self.scan(league)
+            await _sleep(self.stop, POLL_INTERVAL)
+
+    async def scan(self, league):
+        data, log = await asyncio.to_thread(fetch_league_odds, league, self.km, self.recorder)
+        now = datetime.now(timezone.utc)
+        async with self.lock:
+            if data is not None:
+                self.calendar.record_odds(league, data, now)
+            tips = league_tips(league, data, self.store, self.index, now) if data else []
+            if tips:
+                for coupon, msg in tips:
+                    self.outbox.add(msg, key=f"tip:{coupon['id']}", group=league)
+                    self.store.add(coupon)
+                    metrics.count("tips", league=league)
+                self.repo.save_coupons(self.store.coupons())
+                self.outbox.release(league)
+                self.tips += len(tips)
+            self.dirty.set()
+        for line in log:
+            if "OK!" not in line and "cache" not in line:
+                print(f"{league}: {line.strip()}")
+        if tips:
+            print(f"🎯 {league}: nowych typów {len(tips)} ({datetime.now().strftime('%H:%M:%S')})")
+
+    # --- rozliczenia ---
+    def _retry_later(self, tried, now):
+        """Kupony nadal bez wyniku: kolejna próba po SETTLE_RETRY * 2^(próby - 1)."""
+        self.backoff = {cid: b for cid, b in self.backoff.items() if cid in self.store}
+        for coupon_id in tried:
+            if coupon_id in self.store:
+                attempts = self.backoff.get(coupon_id, (0, None))[0] + 1
+                delay = min(SETTLE_BACKOFF_MAX, SETTLE_RETRY * 2 ** (attempts - 1))
+                self.backoff[coupon_id] = (attempts, now + timedelta(seconds=delay))
+
+    async def settler(self):
+        while not self.stop.is_set():
+            now = datetime.now(timezone.utc)
+            held = {cid for cid, (_, at) in self.backoff.items() if at > now}
+            ready = [c['id'] for c in self.store.due(now) if c['id'] not in held]
+            if ready:
+                async with self.lock:
+                    # Bez cache /scores - inaczej ponowna próba w oknie TTL dostaje ten sam "nie zakończony"
+                    await asyncio.to_thread(settle.settle_matches, self.km, self.repo, self.index, False, False, held)
+                    # Rozliczone i przeterminowane zniknęły z repozytorium - indeks od nowa
+                    self.store = CouponStore(self.repo.load_coupons())
+                    self._retry_later(ready, now)
+                    self.dirty.set()
+                continue
+            wake = [at for cid, (_, at) in self.backoff.items() if cid in held]
+            due = self.store.next_finish(after=now)
+            if due is not None:
+                wake.append(due)
+            wait = min([SETTLE_MAX_WAIT] + [(t - now).total_seconds() for t in wake])
+            await _sleep(self.stop, wait)
+
+    async def run(self):
+        self.lock, self.stop, self.dirty = asyncio.Lock(), asyncio.Event(), asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.request_stop)
+
+        metrics.reset("daemon")
+        self.outbox.start()
+        leagues = list(SPORTS_CONFIG)
+        step = POLL_INTERVAL / max(1, len(leagues))
+        tasks = [asyncio.create_task(self.poll_league(league, i * step)) for i, league in enumerate(leagues)]
+        tasks += [asyncio.create_task(self.settler()), asyncio.create_task(self.saver())]
+        refresh = self.refresh_interval(datetime.now(timezone.utc)).total_seconds()
+        print(f"🟢 Daemon: {len(leagues)} lig, sprawdzanie co {POLL_INTERVAL} s, /odds ligi najczęściej co {refresh / 60:.0f} min, "
+              f"zapis po {SAVE_DEBOUNCE} s zmian")
+
+        await self.stop.wait()
+        print("🛑 Zatrzymywanie - czekam na bieżące operacje...")
+        # Bez cancel(): rozpoczęte zapytania i zapisy w wątkach kończą się normalnie,
+        # a każdy zegar wychodzi z pętli po przebudzeniu przez stop
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.shutdown()
+
+    def request_stop(self):
+        self.stop.set()
+        self.dirty.set()        # budzi saver, żeby wyszedł (końcowy zapis robi shutdown)
+
+    async def shutdown(self):
+        async with self.lock:
+            await asyncio.to_thread(self._save)
+        print(await asyncio.to_thread(self.outbox.close))
+        if self.recorder:
+            print(await asyncio.to_thread(self.recorder.close))
+        self.repo.close()
+        print(f"✅ Daemon zatrzymany. Nowych typów w tej sesji: {self.tips}")
+
+if __name__ == "__main__":
+    daemon = Daemon()
+    if not daemon.km.keys:
+        print("❌ BŁĄD: Brak kluczy API!")
+    else:
+        asyncio.run(daemon.run())
@@ -2,9 +2,10 @@ import json
 import os
 import sys
 from datetime import datetime
+from league_index import update_index
+from storage import get_repository
 
 STATS_FILE = "stats.json"
-HISTORY_FILE = "history.json"
 
 def make_deposit():
     try:
@@ -17,12 +18,7 @@ def make_deposit():
     now = datetime.now()
     date_str = now.strftime("%d.%m.%Y %H:%M")
 
-    # --- 1. DOPISANIE DO HISTORII ---
-    history = []
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-            history = json.load(f)
-
+    # --- 1. DOPISANIE DO HISTORII (dziennik history/current.jsonl) ---
     deposit_entry = {
         "id": f"DEP-{int(now.timestamp())}",
         "home": "📥 DEPOZYT",
@@ -34,10 +30,8 @@ def make_deposit():
         "status": "DEPOSIT", # Zmienione na DEPOSIT, aby settle.py mógł to odfiltrować
         "time": now.isoformat()
     }
-    history.append(deposit_entry)
-
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=4, ensure_ascii=False)
+    get_repository().append_history([deposit_entry])
+    update_index([deposit_entry])
 
     # --- 2. AKTUALIZACJA STATS.JSON ---
     if os.path.exists(STATS_FILE):
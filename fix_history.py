@@ -1,18 +1,43 @@
 import os
-import requests
+import sys
 import json
-import time
+import http_client
+import response_cache
+from datetime import datetime, timezone
+from api_keys import KeyManager
+from storage import get_repository
+from scores_api import fetch_scores
+from league_index import update_index
+from settle import settle_coupon
+from coupon_store import ARCHIVE_FILE, SCORES_DAYS_FROM, SETTLE_WINDOW, load_archive, parse_time, save_archive
 
-HISTORY_FILE = "history.json"
-API_KEYS = [os.getenv(k) for k in ["ODDS_KEY", "ODDS_KEY_2"] if os.getenv(k)]
+# Punkt wznowienia - mecze, o które nie zdążyliśmy zapytać przed końcem limitu
+PROGRESS_FILE = "fix_progress.json"
+
+def load_progress():
+    if not os.path.exists(PROGRESS_FILE):
+        return None
+    try:
+        with open(PROGRESS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return None
+
+def save_progress(pending):
+    if not pending:
+        if os.path.exists(PROGRESS_FILE):
+            os.remove(PROGRESS_FILE)
+        return
+    with open(PROGRESS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"pending": pending, "updated": datetime.now(timezone.utc).isoformat()}, f, indent=4)
 
 def fix():
-    if not os.path.exists(HISTORY_FILE): return
-    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-        history = json.load(f)
+    repo = get_repository()
+    if not repo.has_history(): return
+    history = repo.load_history()
 
-    api_key = API_KEYS[0] if API_KEYS else None
-    if not api_key: 
+    km = KeyManager()
+    if not km.keys:
         print("Brak klucza API!")
         return
 
@@ -20,44 +45,118 @@ def fix():
     # Wybieramy tylko te, które nie mają wyniku
     to_fix = [m for m in history if 'score' not in m or m['score'] == '-:-']
 
+    # Wznowienie: pytamy tylko o mecze, których poprzednie uruchomienie nie zdążyło sprawdzić
+    progress = load_progress()
+    if progress:
+        pending_ids = {i for ids in progress["pending"].values() for i in ids}
+        to_fix = [m for m in to_fix if m['id'] in pending_ids]
+        print(f"↩️ Wznawiam od punktu z {progress.get('updated')}.")
+
     print(f"Znaleziono {len(to_fix)} meczów do naprawy.")
 
+    # Pytamy paczkami eventIds per sport (zamiast jednego zapytania na mecz)
+    ids_by_sport = {}
+    for match in to_fix:
+        ids_by_sport.setdefault(match['sport'], []).append(match['id'])
+    results, pending = fetch_scores(km, ids_by_sport)
+
     for match in to_fix:
-        # Pytamy o konkretne ID meczu - to najskuteczniejsza metoda
-        m_id = match['id']
-        sport = match['sport']
-        url = f"https://api.the-odds-api.com/v4/sports/{sport}/scores/?apiKey={api_key}&eventIds={m_id}"
-        
-        try:
-            resp = requests.get(url)
-            if resp.status_code == 429:
-                print("Limit API osiągnięty. Przerywam.")
-                break
-            
-            results = resp.json()
-            if results and isinstance(results, list) and len(results) > 0:
-                api_match = results[0]
-                if api_match.get('completed'):
-                    scores = api_match.get('scores', [])
-                    if len(scores) >= 2:
-                        s1 = scores[0]['score']
-                        s2 = scores[1]['score']
-                        match['score'] = f"{s1}:{s2}"
-                        updated += 1
-                        print(f"✅ SUKCES: {match['home']} vs {match['away']} -> {match['score']}")
-            
-            # Mała pauza, żeby nie zablokować klucza
-            time.sleep(1) 
-            
-        except Exception as e:
-            print(f"Błąd przy ID {m_id}: {e}")
+        api_match = results.get(match['id'])
+        if api_match and api_match.get('completed'):
+            scores = api_match.get('scores') or []
+            if len(scores) >= 2:
+                s1 = scores[0]['score']
+                s2 = scores[1]['score']
+                match['score'] = f"{s1}:{s2}"
+                updated += 1
+                print(f"✅ SUKCES: {match['home']} vs {match['away']} -> {match['score']}")
+
+    save_progress(pending)
+    if pending:
+        print(f"💾 Zapisano punkt wznowienia w {PROGRESS_FILE} - uruchom ponownie po odnowieniu limitu.")
+
+    km.save()
+    response_cache.save()
+    print(http_client.latency_summary())
 
     if updated > 0:
-        with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(history, f, indent=4)
+        repo.write_history(history)
         print(f"--- KONIEC --- Zaktualizowano {updated} pozycji.")
     else:
         print("API nie zwróciło już wyników dla tych ID. Darmowe klucze mają krótką pamięć.")
 
+def _save_settled(settled, left):
+    if settled:
+        get_repository().append_history(settled)
+        update_index(settled)
+    save_archive(left)
+
+def repair_stale():
+    """Rozlicza kupony odłożone przez settle.py (starsze niż okno daysFrom).
+
+    /scores zwraca tylko mecze z ostatnich SCORES_DAYS_FROM dni - pytamy wyłącznie
+    o kupony jeszcze w tym oknie, starsze trzeba rozliczyć ręcznie (mark_stale).
+    """
+    stale = load_archive()
+    if not stale:
+        print(f"ℹ️ Brak kuponów w {ARCHIVE_FILE}.")
+        return
+
+    since = datetime.now(timezone.utc) - SETTLE_WINDOW
+    in_window = [c for c in stale if (parse_time(c.get('time') or '') or since) > since]
+    print(f"🧰 Kuponów do naprawy: {len(stale)}, w oknie /scores: {len(in_window)}")
+
+    results = {}
+    if in_window:
+        km = KeyManager()
+        if not km.keys:
+            print("Brak klucza API!")
+            return
+        ids_by_sport = {}
+        for c in in_window:
+            ids_by_sport.setdefault(c['sport'], []).append(c['id'])
+        results, _ = fetch_scores(km, ids_by_sport, days_from=SCORES_DAYS_FROM)
+        km.save()
+        response_cache.save()
+
+    settled, left = [], []
+    for coupon in stale:
+        record = settle_coupon(coupon, results.get(coupon['id']))
+        if record:
+            settled.append(record)
+            print(f"✅ ROZLICZONO: {coupon['home']} vs {coupon['away']} -> {record['score']} ({record['status']})")
+        else:
+            left.append(coupon)
+
+    _save_settled(settled, left)
+    print(f"--- KONIEC --- Rozliczono {len(settled)}, nadal bez wyniku: {len(left)}")
+    if left:
+        print("ℹ️ Poza oknem API - wpisz wynik ręcznie: python fix_history.py stale <id> <gospodarze>:<goście>")
+
+def mark_stale(coupon_id, score):
+    """Ręczne rozliczenie kuponu z archiwum podanym wynikiem (np. '2:1')."""
+    stale = load_archive()
+    coupon = next((c for c in stale if c['id'] == coupon_id), None)
+    if coupon is None:
+        print(f"❌ Brak kuponu {coupon_id} w {ARCHIVE_FILE}.")
+        return
+    try:
+        h_score, a_score = (int(x) for x in score.split(":"))
+    except ValueError:
+        print(f"❌ Zły format wyniku: {score} (oczekiwano np. 2:1)")
+        return
+
+    record = settle_coupon(coupon, {
+        "completed": True, "home_team": coupon['home'], "away_team": coupon['away'],
+        "scores": [{"name": coupon['home'], "score": h_score}, {"name": coupon['away'], "score": a_score}],
+    })
+    _save_settled([record], [c for c in stale if c['id'] != coupon_id])
+    print(f"✅ ROZLICZONO RĘCZNIE: {coupon['home']} vs {coupon['away']} -> {record['score']} ({record['status']}, {record['profit']} PLN)")
+
 if __name__ == "__main__":
-    fix()
+    if len(sys.argv) > 3 and sys.argv[1] == "stale":
+        mark_stale(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 1 and sys.argv[1] == "stale":
+        repair_stale()
+    else:
+        fix()
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from history_store import atomic_write_json
+from storage import get_repository
+from stats_engine import Analytics, BASE_CAPITAL, GRAPH_POINTS, TAIL_RECORDS
+
+# Kolumnowa kopia historii (.npy, mapowana w pamięci) dla raportów w pandas
+COLUMNS_DIR = "history_columns"
+META_FILE = os.path.join(COLUMNS_DIR, "meta.json")
+COLUMNS_VERSION = 2
+NUMERIC = ("odds", "stake", "profit")
+CATEGORIES = ("sport", "status")
+AWARE_RE = r"(?:Z|[+-]\d\d:?\d\d)$"     # czas ze strefą (stare depozyty są bez)
+DEFAULTS = {"sport": "Inne", "status": ""}
+ALIASES = {"stake": "stawka"}        # stara nazwa pola stawki
+
+def _path(name):
+    return os.path.join(COLUMNS_DIR, name + ".npy")
+
+def _read_meta():
+    try:
+        with open(META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") == COLUMNS_VERSION:
+            return meta
+    except:
+        pass
+    return None
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def to_columns(records, meta):
+    """Zamienia rekordy na tablice; nowe ligi/statusy dopisuje do słowników w meta."""
+    times = pd.Series([m.get('time') or "" for m in records], dtype=object)
+    cols = {
+        "time": pd.to_datetime(times.replace("", None), utc=True, format="ISO8601", errors="coerce")
+                  .to_numpy(dtype="datetime64[ns]"),
+        "aware": times.str.contains(AWARE_RE, regex=True).to_numpy(dtype=bool),
+    }
+    for name in NUMERIC:
+        alias = ALIASES.get(name)
+        cols[name] = np.array([_number(m.get(name) or (m.get(alias) if alias else None)) for m in records],
+                              dtype=np.float64)
+    for name in CATEGORIES:
+        labels = meta[name]
+        codes = {label: i for i, label in enumerate(labels)}
+        values = []
+        for m in records:
+            label = str(m.get(name) or DEFAULTS[name])
+            if label not in codes:
+                codes[label] = len(labels)
+                labels.append(label)
+            values.append(codes[label])
+        cols[name] = np.array(values, dtype=np.int32)
+    return cols
+
+def _save_array(name, array):
+    tmp = os.path.join(COLUMNS_DIR, f".tmp_{name}.npy")
+    np.save(tmp, array)
+    os.replace(tmp, _path(name))
+
+def _load_arrays(meta, mmap=True):
+    arrays = {}
+    for name in ("time", "aware") + NUMERIC + CATEGORIES:
+        arrays[name] = np.load(_path(name), mmap_mode="r" if mmap else None)
+        if len(arrays[name]) != meta["count"]:
+            return None     # przerwany zapis - przebudowa
+    return arrays
+
+def update_columns(full=False, repo=None):
+    """Dopisuje do kolumn rekordy od ostatniego przebiegu (przy edycji historii - od zera)."""
+    repo = repo or get_repository()
+    generation = repo.generation()
+    meta = None if full else _read_meta()
+    arrays = _load_arrays(meta, mmap=False) if meta and meta.get("generation") == generation \
+        and meta.get("backend") == repo.name else None
+
+    if arrays is None:
+        meta = {"version": COLUMNS_VERSION, "generation": generation, "backend": repo.name,
+                "count": 0, "sport": [], "status": []}
+        new_records = repo.load_history()
+    else:
+        new_records = repo.history_since(meta["count"])
+
+    if not new_records and arrays is not None:
+        return meta
+
+    os.makedirs(COLUMNS_DIR, exist_ok=True)
+    new = to_columns(new_records, meta)
+    for name, values in new.items():
+        _save_array(name, np.concatenate([arrays[name], values]) if arrays is not None else values)
+    meta["count"] += len(new_records)
+    meta["updated"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    atomic_write_json(META_FILE, meta)
+    return meta
+
+def load_frame(update=True, repo=None):
+    """DataFrame historii: sport/status jako category, odds/stake/profit float, time datetime64 (UTC)."""
+    meta = update_columns(repo=repo) if update else _read_meta()
+    arrays = _load_arrays(meta) if meta else None
+    if arrays is None:
+        meta = update_columns(full=True, repo=repo)
+        arrays = _load_arrays(meta)
+
+    # time: datetime64[ns] w UTC (bez strefy w typie - szybsze grupowanie)
+    df = pd.DataFrame({name: arrays[name] for name in ("time", "aware") + NUMERIC}, copy=False)
+    for name in CATEGORIES:
+        df[name] = pd.Categorical.from_codes(arrays[name], categories=meta[name])
+    return df
+
+# ================= ANALIZY (wektorowo) =================
+def profit_by(df, key):
+    """Zysk pogrupowany po lidze ('sport'), miesiącu ('month') albo dniu ('day')."""
+    profit = np.nan_to_num(df["profit"].to_numpy())     # brak zysku liczony jak 0 (stats_engine)
+    if key in ("month", "day"):
+        # Sumy dzienne przez bincount na numerach dni, miesiące składamy z nich (mała tablica)
+        days = df["time"].to_numpy().astype("datetime64[D]")
+        valid = ~np.isnat(days)
+        if not valid.any():
+            return pd.Series(dtype=np.float64)
+        codes = days[valid].astype(np.int64)
+        start = codes.min()
+        sums = np.bincount(codes - start, weights=profit[valid])
+        used = np.bincount(codes - start) > 0
+        labels = (np.arange(len(sums))[used] + start).astype("datetime64[D]")
+        result = pd.Series(sums[used], index=labels)
+        if key == "month":
+            result = result.groupby(labels.astype("datetime64[M]")).sum()
+        fmt = "%Y-%m" if key == "month" else "%Y-%m-%d"
+        return pd.Series(result.to_numpy(), index=pd.DatetimeIndex(result.index).strftime(fmt)).round(2)
+    column = df[key]
+    codes = column.cat.codes.to_numpy()
+    sums = np.bincount(codes, weights=profit, minlength=len(column.cat.categories))
+    used = np.bincount(codes, minlength=len(column.cat.categories)) > 0
+    return pd.Series(sums[used], index=column.cat.categories[used]).round(2)
+
+def profit_window(df, now=None, hours=24):
+    """Zysk z meczów z ostatnich `hours` godzin (rekordy z czasem bez strefy pomijane jak w stats_engine)."""
+    now = np.datetime64((now or datetime.now(timezone.utc)).astimezone(timezone.utc).replace(tzinfo=None), "ns")
+    age = now - df["time"].to_numpy()
+    mask = df["aware"].to_numpy() & (age < np.timedelta64(hours, "h"))
+    return float(np.nan_to_num(df["profit"].to_numpy())[mask].sum())
+
+def summary(df):
+    """Liczniki jak w stats_engine: obrót = stawki rozliczonych zakładów (WIN/LOSS)."""
+    status = df["status"]
+    codes = status.cat.codes.to_numpy()
+    code = {label: i for i, label in enumerate(status.cat.categories)}
+    wins, losses = codes == code.get("WIN", -2), codes == code.get("LOSS", -2)
+    profit = np.nan_to_num(df["profit"].to_numpy())
+    return {
+        "count": len(df),
+        "profit": float(profit.sum()),
+        "wins": int(wins.sum()),
+        "losses": int(losses.sum()),
+        "staked": float(np.nansum(df["stake"].to_numpy()[wins | losses])),
+    }
+
+def equity_curve(df, points=GRAPH_POINTS):
+    """Ostatnie punkty krzywej kapitału w kolejności czasu meczu (rekordy bez czasu na początku)."""
+    times = df["time"].to_numpy().astype(np.int64)     # NaT = najmniejsza wartość int64
+    order = np.argsort(times, kind="stable")
+    equity = BASE_CAPITAL + np.cumsum(np.nan_to_num(df["profit"].to_numpy())[order])
+    curve = np.concatenate([[BASE_CAPITAL], equity])[-points:]
+    return [round(float(v), 2) for v in curve]
+
+def analyze(now=None, repo=None):
+    """Analytics policzone z kolumn (te same pola co checkpoint w stats_engine)."""
+    now = now or datetime.now(timezone.utc)
+    repo = repo or get_repository()
+    df = load_frame(repo=repo)
+    cp = summary(df)
+    cp["graph_tail"] = equity_curve(df)
+    cp["recent"] = [[now.timestamp(), profit_window(df, now)]]     # suma 24h jako jeden wpis
+    cp["monthly"] = profit_by(df, "month").to_dict()
+    cp["daily"] = profit_by(df, "day").to_dict()
+    cp["leagues"] = profit_by(df, "sport").to_dict()
+    cp["tail"] = repo.history_since(max(cp["count"] - TAIL_RECORDS, 0))
+    return Analytics(cp, now)
+
+if __name__ == "__main__":
+    full = len(sys.argv) > 1 and sys.argv[1] == "rebuild"
+    meta = update_columns(full=full)
+    print(f"✅ Kolumny historii ({'pełna przebudowa' if full else 'przyrostowo'}): {meta['count']} rekordów w {COLUMNS_DIR}/")
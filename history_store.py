@@ -0,0 +1,478 @@
+import os
+import re
+import sys
+import json
+import tempfile
+import metrics
+from datetime import datetime, timezone
+from coupon_store import SETTLE_WINDOW
+
+# Historia w partycjach miesięcznych (miesiąc meczu):
+#   history/RRRR-MM.json  - zamknięte miesiące, po zamknięciu już się nie zmieniają
+#   history/current.jsonl - dziennik otwartych miesięcy, dopisanie = jedna linia (O(1))
+#   history/manifest.json - lista partycji z agregatami + podsumowanie dziennika
+# Miesiąc zamykamy, gdy minie okno /scores od jego końca - wtedy jego rekordy
+# przechodzą z dziennika do RRRR-MM.json. Odczyty przyrostowe (load_since) i po
+# czasie (load_between) otwierają tylko potrzebne pliki - zwykle sam dziennik.
+HISTORY_DIR = "history"
+MANIFEST_FILE = os.path.join(HISTORY_DIR, "manifest.json")
+JOURNAL_FILE = os.path.join(HISTORY_DIR, "current.jsonl")
+# Dawny układ: jeden history.json + dziennik history.jsonl (migracja: python history_store.py migrate)
+LEGACY_FILE = "history.json"
+LEGACY_JOURNAL = "history.jsonl"
+LEGACY_META = "history_meta.json"
+EXPORT_FILE = "history_full.json"       # python history_store.py export - całość w jednym pliku
+MONTH = re.compile(r"^\d{4}-\d{2}")
+
+def atomic_write_json(path, data, indent=4):
+    """Zapis przez plik tymczasowy + os.replace - przerwany zapis nie psuje pliku."""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        metrics.file_io("write", path)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def _read_json(path):
+    metrics.file_io("read", path)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _read_lines(path):
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    metrics.file_io("read", path)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # Urwana ostatnia linia po awarii - pomijamy
+                print(f"⚠️ Pominięto uszkodzony wpis w {path}")
+    return entries
+
+def _lines(entries):
+    return "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+
+# ================= DAWNY UKŁAD (history.json + history.jsonl) =================
+def _load_legacy():
+    snapshot = _read_json(LEGACY_FILE) if os.path.exists(LEGACY_FILE) else []
+    journal = _read_lines(LEGACY_JOURNAL)
+    # Dziennik już scalony ze snapshotem (awaria przed jego usunięciem) - bez dublowania
+    if journal and len(snapshot) >= len(journal) and snapshot[-len(journal):] == journal:
+        journal = []
+    return snapshot + journal
+
+def has_legacy():
+    return os.path.exists(LEGACY_FILE) or os.path.exists(LEGACY_JOURNAL)
+
+# ================= KLUCZ PARTYCJI =================
+def _path(month):
+    return os.path.join(HISTORY_DIR, f"{month}.json")
+
+def month_of(entry):
+    t = entry.get('time') or ''
+    return t[:7] if MONTH.match(t) else None
+
+def current_month(now=None):
+    return (now or datetime.now(timezone.utc)).strftime("%Y-%m")
+
+def partition_keys(records, last=None, now=None):
+    """Miesiąc meczu każdego rekordu; rekord bez czasu idzie z poprzednim (albo do bieżącego miesiąca)."""
+    keys = []
+    for m in records:
+        last = month_of(m) or last or current_month(now)
+        keys.append(last)
+    return keys
+
+def is_sealed(month, now=None):
+    """Miesiąc zamknięty: od jego końca minęło okno /scores - kolejne rozliczenia już nie przyjdą same."""
+    year, mon = int(month[:4]), int(month[5:7])
+    month_end = datetime(year + mon // 12, mon % 12 + 1, 1, tzinfo=timezone.utc)
+    return (now or datetime.now(timezone.utc)) >= month_end + SETTLE_WINDOW
+
+# ================= AGREGATY =================
+def _empty_summary():
+    return {"count": 0, "size": None, "first_time": None, "last_time": None,
+            "wins": 0, "losses": 0, "staked": 0.0, "profit": 0.0, "finance": 0.0, "leagues": {}}
+
+def _add(part, records):
+    """Dolicza rekordy do agregatów (dopisanie do dziennika bez czytania go)."""
+    part["count"] += len(records)
+    for m in records:
+        t = m.get('time')
+        if t:
+            part["first_time"] = min(part["first_time"] or t, t)
+            part["last_time"] = max(part["last_time"] or t, t)
+        profit = float(m.get('profit') or 0)
+        if m.get('sport') == "FINANCE":
+            part["finance"] += profit
+            continue
+        part["profit"] += profit
+        if m.get('status') in ("WIN", "LOSS"):
+            part["wins" if m['status'] == "WIN" else "losses"] += 1
+            part["staked"] += float(m.get('stake') or 0)
+        sport = m.get('sport') or "?"
+        part["leagues"][sport] = part["leagues"].get(sport, 0.0) + profit
+    for key in ("staked", "profit", "finance"):
+        part[key] = round(part[key], 2)
+    part["leagues"] = {k: round(v, 2) for k, v in sorted(part["leagues"].items())}
+    return part
+
+def summarize(month, records):
+    """Agregaty partycji do manifestu (bez otwierania jej przy prostych pytaniach)."""
+    part = dict(_add(_empty_summary(), records), month=month)
+    if os.path.exists(_path(month)):
+        part["size"] = os.path.getsize(_path(month))
+    return part
+
+def summarize_journal(records, keys):
+    part = _add(_empty_summary(), records)
+    part["months"] = {}
+    for key in keys:
+        part["months"][key] = part["months"].get(key, 0) + 1
+    part["last_month"] = keys[-1] if keys else None
+    part["size"] = os.path.getsize(JOURNAL_FILE) if os.path.exists(JOURNAL_FILE) else 0
+    return part
+
+# ================= MANIFEST =================
+def _months_on_disk():
+    if not os.path.isdir(HISTORY_DIR):
+        return []
+    return sorted(name[:-5] for name in os.listdir(HISTORY_DIR) if MONTH.match(name) and name.endswith(".json"))
+
+def _read_journal(sealed):
+    """Rekordy dziennika bez miesięcy, które mają już partycję (przerwane zamknięcie miesiąca)."""
+    records = _read_lines(JOURNAL_FILE)
+    keys = partition_keys(records)
+    kept = [(m, k) for m, k in zip(records, keys) if k not in sealed]
+    return [m for m, _ in kept], [k for _, k in kept]
+
+def read_manifest():
+    """Manifest albo None (historia jeszcze w dawnym układzie / brak historii).
+
+    Plik o innym rozmiarze niż w manifeście (przerwany zapis między plikami)
+    jest czytany ponownie i jego agregaty przeliczane.
+    """
+    if not os.path.exists(MANIFEST_FILE):
+        return None
+    try:
+        manifest = _read_json(MANIFEST_FILE)
+    except:
+        return rebuild_manifest(write=False)
+    if [p["month"] for p in manifest["partitions"]] != _months_on_disk():
+        # Partycja zapisana, manifest już nie (awaria) - odtwarzamy z plików
+        return rebuild_manifest(write=False, generation=manifest.get("generation", 0))
+    for i, part in enumerate(manifest["partitions"]):
+        if os.path.getsize(_path(part["month"])) != part.get("size"):
+            manifest["partitions"][i] = summarize(part["month"], _read_json(_path(part["month"])))
+    journal = manifest.get("journal") or {}
+    size = os.path.getsize(JOURNAL_FILE) if os.path.exists(JOURNAL_FILE) else 0
+    if size != journal.get("size"):
+        manifest["journal"] = summarize_journal(*_read_journal(set(_months_on_disk())))
+    manifest["count"] = sum(p["count"] for p in manifest["partitions"]) + manifest["journal"]["count"]
+    return manifest
+
+def _write_manifest(manifest):
+    manifest["count"] = sum(p["count"] for p in manifest["partitions"]) + manifest["journal"]["count"]
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    atomic_write_json(MANIFEST_FILE, manifest, indent=2)
+
+def rebuild_manifest(write=True, generation=None):
+    """Manifest odtworzony z plików partycji i dziennika (np. po ręcznej edycji)."""
+    months = _months_on_disk()
+    if generation is None:
+        try:
+            with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+                generation = json.load(f).get("generation", 0)
+        except:
+            generation = 0
+    manifest = {"generation": generation,
+                "partitions": [summarize(m, _read_json(_path(m))) for m in months],
+                "journal": summarize_journal(*_read_journal(set(months)))}
+    manifest["count"] = sum(p["count"] for p in manifest["partitions"]) + manifest["journal"]["count"]
+    if write:
+        _write_manifest(manifest)
+    return manifest
+
+def _bump_generation(manifest):
+    # Generacja przed zapisem: awaria w połowie i tak wymusi pełne przeliczenie
+    manifest["generation"] = manifest.get("generation", 0) + 1
+    if os.path.exists(MANIFEST_FILE):
+        _write_manifest(manifest)
+
+def _write_partition(month, records):
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    atomic_write_json(_path(month), records)
+    return summarize(month, records)
+
+def _write_journal(records):
+    """Pełne nadpisanie dziennika (zamknięcie miesiąca, przebudowa) - przez plik tymczasowy."""
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    if not records:
+        if os.path.exists(JOURNAL_FILE):
+            os.remove(JOURNAL_FILE)
+        return
+    fd, tmp = tempfile.mkstemp(dir=HISTORY_DIR, prefix=".tmp_", suffix=".jsonl")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(_lines(records))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, JOURNAL_FILE)
+    metrics.file_io("write", JOURNAL_FILE)
+
+def _load_partition(part):
+    return _read_json(_path(part["month"])) if part["count"] else []
+
+def _load_journal(manifest):
+    if not manifest["journal"]["count"]:
+        return []
+    return _read_journal({p["month"] for p in manifest["partitions"]})[0]
+
+# ================= ODCZYT =================
+def has_history():
+    manifest = read_manifest()
+    return manifest["count"] > 0 if manifest is not None else has_legacy()
+
+def load_history():
+    """Pełna historia: zamknięte miesiące po kolei, potem dziennik w kolejności dopisywania."""
+    manifest = read_manifest()
+    if manifest is None:
+        return _load_legacy()
+    history = []
+    for part in manifest["partitions"]:
+        history.extend(_load_partition(part))
+    return history + _load_journal(manifest)
+
+def load_since(offset):
+    """Rekordy od pozycji `offset` (w kolejności load_history).
+
+    Liczniki partycji z manifestu pozwalają pominąć pliki w całości przed
+    offsetem - zwykle czytamy tylko dziennik.
+    """
+    manifest = read_manifest()
+    if manifest is None:
+        return _load_legacy()[offset:]
+    result, position = [], 0
+    for part in manifest["partitions"]:
+        end = position + part["count"]
+        if end > offset:
+            result.extend(_load_partition(part)[max(0, offset - position):])
+        position = end
+    if position + manifest["journal"]["count"] > offset:
+        result.extend(_load_journal(manifest)[max(0, offset - position):])
+    return result
+
+def history_count():
+    manifest = read_manifest()
+    return manifest["count"] if manifest is not None else len(_load_legacy())
+
+def _overlaps(part, start, end):
+    if part["last_time"] is None or part["last_time"] < start:
+        return False
+    return end is None or part["first_time"] < end
+
+def load_between(start, end=None):
+    """Rekordy z czasem meczu w [start, end) - tylko pliki, których zakres czasu się przecina."""
+    manifest = read_manifest()
+    if manifest is None:
+        records = _load_legacy()
+    else:
+        records = []
+        for part in manifest["partitions"]:
+            if _overlaps(part, start, end):
+                records.extend(_load_partition(part))
+        if _overlaps(manifest["journal"], start, end):
+            records.extend(_load_journal(manifest))
+    return [m for m in records if (m.get('time') or '') >= start and (end is None or (m.get('time') or '') < end)]
+
+def league_profit(sport):
+    """Zysk ligi z agregatów manifestu - bez czytania partycji."""
+    manifest = read_manifest()
+    if manifest is None:
+        return round(sum(float(m.get('profit') or 0) for m in _load_legacy() if m.get('sport') == sport), 2)
+    parts = manifest["partitions"] + [manifest["journal"]]
+    return round(sum(p["leagues"].get(sport, 0.0) for p in parts), 2)
+
+def read_meta():
+    manifest = read_manifest()
+    if manifest is not None:
+        return {"generation": manifest.get("generation", 0), "count": manifest["count"]}
+    try:
+        with open(LEGACY_META, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return {"generation": 0}
+
+# ================= ZAPIS =================
+def _manifest_for_write():
+    manifest = read_manifest()
+    if manifest is None:
+        migrate()
+        manifest = read_manifest() or {"generation": 0, "partitions": [], "journal": summarize_journal([], [])}
+    return manifest
+
+def seal_months(manifest=None, now=None):
+    """Przenosi z dziennika do RRRR-MM.json miesiące, które już się zamknęły. Zwraca ich listę."""
+    manifest = manifest or _manifest_for_write()
+    to_seal = sorted(m for m in manifest["journal"].get("months", {}) if is_sealed(m, now))
+    if not to_seal:
+        return []
+    records, keys = _read_journal({p["month"] for p in manifest["partitions"]})
+    groups, rest = {}, []
+    for m, key in zip(records, keys):
+        if key in to_seal:
+            groups.setdefault(key, []).append(m)
+        else:
+            rest.append(m)
+    moved = [m for month in to_seal for m in groups.get(month, [])]
+    # Kolejność load_history się zmienia, gdy zamykane rekordy nie były początkiem dziennika
+    if any(a is not b for a, b in zip(moved, records)):
+        _bump_generation(manifest)
+
+    parts = {p["month"]: p for p in manifest["partitions"]}
+    for month in to_seal:
+        if groups.get(month):
+            # Najpierw partycja (odczyt pomija jej miesiąc w dzienniku), potem dziennik bez niej
+            parts[month] = _write_partition(month, groups[month])
+    _write_journal(rest)
+    manifest["partitions"] = [parts[m] for m in sorted(parts)]
+    manifest["journal"] = summarize_journal(rest, partition_keys(rest))
+    _write_manifest(manifest)
+    return [m for m in to_seal if groups.get(m)]
+
+def append_history(entries, now=None):
+    """Dopisuje rekordy na koniec dziennika (fsync po zapisie).
+
+    Rekord meczu z zamkniętego miesiąca (np. naprawa fix_history.py stale) trafia
+    do jego partycji - to zmienia kolejność historii, więc podbijamy generację.
+    """
+    if not entries:
+        return
+    manifest = _manifest_for_write()
+    seal_months(manifest, now)
+
+    journal = manifest["journal"]
+    keys = partition_keys(entries, journal.get("last_month"), now)
+    sealed = {p["month"] for p in manifest["partitions"]}
+    late, fresh, fresh_keys = {}, [], []
+    for entry, key in zip(entries, keys):
+        if key in sealed or is_sealed(key, now):
+            late.setdefault(key, []).append(entry)
+        else:
+            fresh.append(entry)
+            fresh_keys.append(key)
+
+    if late:
+        _bump_generation(manifest)
+        parts = {p["month"]: p for p in manifest["partitions"]}
+        for month, records in late.items():
+            existing = _load_partition(parts[month]) if month in parts else []
+            parts[month] = _write_partition(month, existing + records)
+        manifest["partitions"] = [parts[m] for m in sorted(parts)]
+
+    if fresh:
+        os.makedirs(HISTORY_DIR, exist_ok=True)
+        lines = _lines(fresh)
+        with open(JOURNAL_FILE, "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        metrics.file_io("append", JOURNAL_FILE, len(lines.encode("utf-8")))
+        _add(journal, fresh)
+        for key in fresh_keys:
+            journal["months"][key] = journal["months"].get(key, 0) + 1
+        journal["last_month"] = fresh_keys[-1]
+        journal["size"] = os.path.getsize(JOURNAL_FILE)
+    _write_manifest(manifest)
+
+def write_history(history, edited=True, generation=None, now=None):
+    """Pełne nadpisanie historii. Zapisywane są tylko pliki, których treść się zmieniła.
+
+    edited=True oznacza zmianę istniejących rekordów - podbijamy generację,
+    żeby liczniki przyrostowe (stats_engine) przeliczyły się od zera. Tak samo,
+    gdy podział na miesiące zmienia kolejność rekordów.
+    """
+    manifest = read_manifest() or {"generation": 0, "partitions": [], "journal": summarize_journal([], [])}
+    if generation is not None:
+        manifest["generation"] = generation
+
+    groups, open_records, open_keys = {}, [], []
+    for entry, key in zip(history, partition_keys(history, now=now)):
+        if is_sealed(key, now):
+            groups.setdefault(key, []).append(entry)
+        else:
+            open_records.append(entry)
+            open_keys.append(key)
+    ordered = [m for month in sorted(groups) for m in groups[month]] + open_records
+    if edited or any(a is not b for a, b in zip(ordered, history)):
+        _bump_generation(manifest)
+
+    old = {p["month"]: p for p in manifest["partitions"]}
+    parts = []
+    for month in sorted(groups):
+        if month in old and os.path.exists(_path(month)) and _load_partition(old[month]) == groups[month]:
+            parts.append(summarize(month, groups[month]))
+        else:
+            parts.append(_write_partition(month, groups[month]))
+    for month in _months_on_disk():
+        if month not in groups:
+            os.remove(_path(month))
+    _write_journal(open_records)
+    manifest["partitions"] = parts
+    manifest["journal"] = summarize_journal(open_records, open_keys)
+    _write_manifest(manifest)
+
+def migrate():
+    """history.json + history.jsonl -> partycje miesięczne. Zwraca liczbę rekordów albo None."""
+    if os.path.exists(MANIFEST_FILE) or not has_legacy():
+        return None
+    history = _load_legacy()
+    try:
+        with open(LEGACY_META, "r", encoding="utf-8") as f:
+            generation = json.load(f).get("generation", 0)
+    except:
+        generation = 0
+    write_history(history, edited=False, generation=generation)
+    for path in (LEGACY_FILE, LEGACY_JOURNAL, LEGACY_META):
+        if os.path.exists(path):
+            os.remove(path)
+    print(f"🗂 Historia przeniesiona do partycji miesięcznych ({HISTORY_DIR}/): {len(history)} rekordów")
+    return len(history)
+
+def export_history(path=EXPORT_FILE):
+    """Zapisuje pełną historię jako jeden plik w formacie dawnego history.json."""
+    history = load_history()
+    atomic_write_json(path, history)
+    return len(history)
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "manifest"
+    if cmd == "migrate":
+        count = migrate()
+        print("ℹ️ Nic do migracji." if count is None else f"✅ Zmigrowano {count} rekordów.")
+    elif cmd == "seal":
+        print(f"✅ Zamknięte miesiące: {', '.join(seal_months()) or 'brak'}")
+    elif cmd == "manifest":
+        manifest = rebuild_manifest()
+        for p in manifest["partitions"]:
+            print(f"{p['month']}: {p['count']:>6} rekordów | zysk {p['profit']:>10.2f} | {p['size'] or 0:>9} B")
+        j = manifest["journal"]
+        print(f"dziennik: {j['count']:>6} rekordów | zysk {j['profit']:>10.2f} | {j['size'] or 0:>9} B | miesiące: {', '.join(sorted(j['months'])) or '-'}")
+        print(f"✅ Manifest odświeżony: {len(manifest['partitions'])} partycji, {manifest['count']} rekordów")
+    elif cmd == "export":
+        target = sys.argv[2] if len(sys.argv) > 2 else EXPORT_FILE
+        print(f"✅ Wyeksportowano {export_history(target)} rekordów do {target}")
+    else:
+        print("Użycie: python history_store.py [migrate|seal|manifest|export [plik]]")
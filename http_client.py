@@ -0,0 +1,119 @@
+import os
+import re
+import time
+import random
+import threading
+import requests
+import metrics
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+
+# ================= KONFIGURACJA =================
+TIMEOUT = 15
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5         # sekundy, podwajane przy każdej próbie
+BACKOFF_MAX = 30
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+POOL_SIZE = 16             # >= SCAN_WORKERS w start.py
+LOG_CALLS = os.getenv("HTTP_LOG") == "1"
+LATENCY_SAMPLES = 10000    # czasy ostatnich zapytań do podsumowania (daemon.py działa tygodniami)
+
+_session = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_latencies = deque(maxlen=LATENCY_SAMPLES)
+_calls = 0
+
+def get_session():
+    """Jedna sesja keep-alive na cały proces (pula połączeń per host)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+    return _session
+
+def _safe_path(url):
+    # Token bota i apiKey nie mogą trafić do logów
+    path = re.sub(r"^https?://[^/]+", "", url)
+    return re.sub(r"/bot[^/]+", "/bot***", path)
+
+def _retry_after(resp):
+    """Czas oczekiwania z nagłówka Retry-After lub z odpowiedzi Telegrama."""
+    val = resp.headers.get("Retry-After")
+    if val:
+        try:
+            return float(val)
+        except ValueError:
+            try:
+                return max(0.0, (parsedate_to_datetime(val) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    try:
+        return float(resp.json()["parameters"]["retry_after"])
+    except Exception:
+        return None
+
+def _backoff(attempt):
+    # Pełny jitter: losowo z przedziału [0, base * 2^attempt]
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def request(method, url, retries=MAX_RETRIES, retry_statuses=RETRY_STATUSES, timeout=TIMEOUT, **kwargs):
+    """Zapytanie HTTP przez wspólną sesję z ponawianiem.
+
+    Zwraca ostatnią odpowiedź (także błędną) albo None, gdy nie udało się połączyć.
+    """
+    session = get_session()
+    resp = None
+
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        try:
+            resp = session.request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            _record(method, url, None, start)
+            if attempt == retries:
+                print(f"  🌐 {method} {_safe_path(url)} - błąd połączenia: {e}")
+                return None
+            time.sleep(_backoff(attempt))
+            continue
+
+        _record(method, url, resp.status_code, start)
+        if resp.status_code not in retry_statuses or attempt == retries:
+            return resp
+
+        wait = _retry_after(resp)
+        time.sleep(min(BACKOFF_MAX, wait) if wait is not None else _backoff(attempt))
+
+    return resp
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def _record(method, url, status, start):
+    global _calls
+    ms = (time.perf_counter() - start) * 1000
+    with _stats_lock:
+        _latencies.append(ms)
+        _calls += 1
+    metrics.observe_http(url, status, ms / 1000)
+    if LOG_CALLS:
+        print(f"  🌐 {method} {_safe_path(url)} -> {status or 'ERR'} ({ms:.0f} ms)")
+
+def latency_summary():
+    with _stats_lock:
+        data, calls = sorted(_latencies), _calls
+    if not data:
+        return "🌐 HTTP: brak zapytań"
+    avg = sum(data) / len(data)
+    p95 = data[min(len(data) - 1, int(len(data) * 0.95))]
+    window = f" (czasy z ostatnich {len(data)})" if calls > len(data) else ""
+    return f"🌐 HTTP: {calls} zapytań{window} | śr. {avg:.0f} ms | p95 {p95:.0f} ms | max {data[-1]:.0f} ms"
@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+import metrics
+from datetime import datetime, timezone
+from storage import get_repository
+
+# Zagregowane wyniki per liga - get_smart_stake czyta stąd zamiast z całej historii
+INDEX_FILE = "league_stats.json"
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def _add(index, entry, stamp):
+    sport = entry.get('sport') or "UNKNOWN"
+    row = index.setdefault(sport, {"profit": 0.0, "stake": 0.0, "count": 0, "updated": stamp})
+    row["profit"] = round(row["profit"] + float(entry.get('profit') or 0), 2)
+    row["stake"] = round(row["stake"] + float(entry.get('stake') or 0), 2)
+    row["count"] += 1
+    row["updated"] = stamp
+
+def save_index(index):
+    with open(INDEX_FILE, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=4, ensure_ascii=False)
+    metrics.file_io("write", INDEX_FILE)
+
+def compute_index(history):
+    index, stamp = {}, _now()
+    for m in history:
+        _add(index, m, stamp)
+    return index
+
+def rebuild_index(history=None):
+    """Przelicza indeks od zera z pełnej historii."""
+    index = compute_index(get_repository().load_history() if history is None else history)
+    save_index(index)
+    return index
+
+def load_index():
+    if os.path.exists(INDEX_FILE):
+        try:
+            metrics.file_io("read", INDEX_FILE)
+            with open(INDEX_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except:
+            pass
+    # Brak albo uszkodzony indeks - jednorazowa przebudowa
+    return rebuild_index()
+
+def update_index(entries, index=None):
+    """Dopisuje nowe rekordy historii do indeksu (bez czytania history.json).
+
+    Podany indeks (już wczytany, np. w pipeline.py) jest aktualizowany w miejscu.
+    """
+    if not entries:
+        return index
+    index, stamp = load_index() if index is None else index, _now()
+    for m in entries:
+        _add(index, m, stamp)
+    save_index(index)
+    return index
+
+def verify_index():
+    """Porównuje zapisany indeks z przeliczeniem z historii. Zwraca listę różnic."""
+    stored, fresh = load_index(), compute_index(get_repository().load_history())
+    diffs = []
+    for sport in sorted(set(stored) | set(fresh)):
+        a, b = stored.get(sport, {}), fresh.get(sport, {})
+        for field in ("profit", "stake", "count"):
+            if abs(float(a.get(field, 0)) - float(b.get(field, 0))) > 0.01:
+                diffs.append(f"{sport}.{field}: indeks={a.get(field)} historia={b.get(field)}")
+    return diffs
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    if cmd == "rebuild":
+        idx = rebuild_index()
+        print(f"✅ Indeks przebudowany: {len(idx)} lig.")
+    elif cmd == "verify":
+        diffs = verify_index()
+        for d in diffs:
+            print(f"❌ {d}")
+        print("✅ Indeks zgodny z historią." if not diffs else f"⚠️ Rozbieżności: {len(diffs)} (uruchom: python league_index.py rebuild)")
+        sys.exit(1 if diffs else 0)
+    else:
+        print("Użycie: python league_index.py [verify|rebuild]")
@@ -0,0 +1,162 @@
+import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Lekkie metryki przebiegu: czasy etapów (także per liga), opóźnienia HTTP,
+# kody odpowiedzi, zużycie limitu per klucz/liga, rozmiary plików.
+# Każdy przebieg zapisuje metrics/<nazwa>.json, opcjonalnie plik tekstowy Prometheusa
+# (METRICS_PROM_DIR = katalog textfile collectora node_exporter).
+METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+PROM_DIR = os.getenv("METRICS_PROM_DIR")
+HTTP_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)     # sekundy
+
+_lock = threading.Lock()
+_run = {"name": None, "started": None, "t0": None}
+_spans = {}         # (etap, liga) -> {"count", "sum", "max"}
+_http = {}          # endpoint -> {"buckets", "count", "sum", "status": {kod: n}}
+_quota = {}         # (klucz, liga) -> zużyte jednostki
+_files = {}         # (operacja, plik) -> {"count", "bytes"}
+_counters = {}      # (nazwa, liga) -> wartość
+
+def reset(name):
+    """Początek przebiegu (start, settle...) - czyści liczniki."""
+    with _lock:
+        for store in (_spans, _http, _quota, _files, _counters):
+            store.clear()
+        _run.update(name=name, started=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    t0=time.perf_counter())
+
+def _add_span(stage, league, seconds):
+    with _lock:
+        row = _spans.setdefault((stage, league), {"count": 0, "sum": 0.0, "max": 0.0})
+        row["count"] += 1
+        row["sum"] += seconds
+        row["max"] = max(row["max"], seconds)
+
+@contextmanager
+def span(stage, league=None):
+    """with metrics.span("value", league): ... - czas etapu (sumowany przy powtórzeniach)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add_span(stage, league, time.perf_counter() - start)
+
+def endpoint_of(url):
+    # /v4/sports/<liga>/odds -> odds, /bot<token>/sendMessage -> sendMessage
+    path = re.sub(r"^https?://[^/]+", "", url).split("?")[0]
+    return path.rstrip("/").rsplit("/", 1)[-1] or "/"
+
+def observe_http(url, status, seconds):
+    endpoint = endpoint_of(url)
+    with _lock:
+        row = _http.setdefault(endpoint, {"buckets": [0] * len(HTTP_BUCKETS), "count": 0, "sum": 0.0, "status": {}})
+        for i, bound in enumerate(HTTP_BUCKETS):
+            if seconds <= bound:
+                row["buckets"][i] += 1
+        row["count"] += 1
+        row["sum"] += seconds
+        code = str(status or "ERR")
+        row["status"][code] = row["status"].get(code, 0) + 1
+
+def add_quota(key_name, units, league=None):
+    if units:
+        with _lock:
+            _quota[(key_name, league)] = _quota.get((key_name, league), 0) + units
+
+def file_io(op, path, size=None):
+    """Rozmiar odczytanego/zapisanego pliku (op: read | write | append)."""
+    if size is None:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+    with _lock:
+        row = _files.setdefault((op, os.path.basename(path)), {"count": 0, "bytes": 0})
+        row["count"] += 1
+        row["bytes"] += size
+
+def count(name, value=1, league=None):
+    with _lock:
+        _counters[(name, league)] = _counters.get((name, league), 0) + value
+
+# ================= EKSPORT =================
+def snapshot():
+    with _lock:
+        duration = time.perf_counter() - _run["t0"] if _run["t0"] else 0.0
+        return {
+            "run": _run["name"],
+            "started": _run["started"],
+            "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "duration": round(duration, 3),
+            "spans": [{"stage": s, "league": l, "count": r["count"], "seconds": round(r["sum"], 4),
+                       "max": round(r["max"], 4)} for (s, l), r in sorted(_spans.items(), key=lambda x: (x[0][0], x[0][1] or ""))],
+            "http": {e: dict(r, sum=round(r["sum"], 4), le=list(HTTP_BUCKETS)) for e, r in sorted(_http.items())},
+            "quota": [{"key": k, "league": l, "units": u} for (k, l), u in sorted(_quota.items(), key=lambda x: (x[0][0], x[0][1] or ""))],
+            "files": [{"op": o, "file": f, **r} for (o, f), r in sorted(_files.items())],
+            "counters": [{"name": n, "league": l, "value": v} for (n, l), v in sorted(_counters.items(), key=lambda x: (x[0][0], x[0][1] or ""))],
+        }
+
+def _labels(**labels):
+    parts = [f'{k}="{str(v)}"' for k, v in labels.items() if v is not None]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def prometheus(data):
+    """Format tekstowy Prometheusa (dla textfile collectora)."""
+    run = data["run"]
+    lines = [
+        "# TYPE bot_run_duration_seconds gauge",
+        f"bot_run_duration_seconds{_labels(run=run)} {data['duration']}",
+        "# TYPE bot_run_last_success_timestamp_seconds gauge",
+        f"bot_run_last_success_timestamp_seconds{_labels(run=run)} {int(time.time())}",
+        "# TYPE bot_stage_seconds summary",
+    ]
+    for s in data["spans"]:
+        labels = _labels(run=run, stage=s["stage"], league=s["league"])
+        lines += [f"bot_stage_seconds_sum{labels} {s['seconds']}", f"bot_stage_seconds_count{labels} {s['count']}"]
+    lines.append("# TYPE bot_http_request_duration_seconds histogram")
+    for endpoint, r in data["http"].items():
+        for bound, n in zip(HTTP_BUCKETS, r["buckets"]):
+            lines.append(f"bot_http_request_duration_seconds_bucket{_labels(run=run, endpoint=endpoint, le=bound)} {n}")
+        lines += [f"bot_http_request_duration_seconds_bucket{_labels(run=run, endpoint=endpoint, le='+Inf')} {r['count']}",
+                  f"bot_http_request_duration_seconds_sum{_labels(run=run, endpoint=endpoint)} {r['sum']}",
+                  f"bot_http_request_duration_seconds_count{_labels(run=run, endpoint=endpoint)} {r['count']}"]
+    lines.append("# TYPE bot_http_responses_total counter")
+    for endpoint, r in data["http"].items():
+        for code, n in sorted(r["status"].items()):
+            lines.append(f"bot_http_responses_total{_labels(run=run, endpoint=endpoint, code=code)} {n}")
+    lines.append("# TYPE bot_quota_units_total counter")
+    for q in data["quota"]:
+        lines.append(f"bot_quota_units_total{_labels(run=run, key=q['key'], league=q['league'])} {q['units']}")
+    lines.append("# TYPE bot_file_bytes gauge")
+    for f in data["files"]:
+        lines.append(f"bot_file_bytes{_labels(run=run, op=f['op'], file=f['file'])} {f['bytes']}")
+    lines.append("# TYPE bot_events_total counter")
+    for c in data["counters"]:
+        lines.append(f"bot_events_total{_labels(run=run, name=c['name'], league=c['league'])} {c['value']}")
+    return "\n".join(lines) + "\n"
+
+def _replace(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def write():
+    """Zapisuje metryki przebiegu. Zwraca linię podsumowania do logu."""
+    data = snapshot()
+    name = data["run"] or "run"
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"{name}.json")
+    _replace(path, json.dumps(data, indent=2, ensure_ascii=False))
+    if PROM_DIR:
+        os.makedirs(PROM_DIR, exist_ok=True)
+        _replace(os.path.join(PROM_DIR, f"bukmacher_{name}.prom"), prometheus(data))
+
+    requests = sum(r["count"] for r in data["http"].values())
+    units = sum(q["units"] for q in data["quota"])
+    return f"📏 Metryki: {path} | czas {data['duration']:.1f} s | HTTP {requests} | limit API: {units} j."
@@ -0,0 +1,190 @@
+import os
+import sys
+import gzip
+import json
+import queue
+import threading
+from datetime import datetime, timezone, timedelta
+
+# Archiwum surowych odpowiedzi /odds - na jakich kursach bot podejmował decyzje
+# Segment = plik .jsonl.gz (jeden na dzień lub po przekroczeniu rozmiaru). Każda
+# odpowiedź to osobny człon gzip, więc indeks (offset, długość) pozwala odczytać
+# ją bez rozpakowywania całego segmentu.
+ARCHIVE_DIR = "odds_archive"
+INDEX_FILE = os.path.join(ARCHIVE_DIR, "index.jsonl")
+ENABLED = os.getenv("ODDS_ARCHIVE", "1") != "0"
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+KEEP_DAYS = 30
+QUEUE_SIZE = 64                 # odpowiedzi czekające na zapis (scan nie czeka na dysk)
+
+def _segment_name(day, part):
+    return f"odds-{day}-{part:02d}.jsonl.gz"
+
+class OddsRecorder:
+    """Zapis w tle: record() tylko wrzuca odpowiedź do kolejki, kompresja i dopisywanie w wątku."""
+
+    def __init__(self, path=ARCHIVE_DIR):
+        self.path = path
+        self.index_path = os.path.join(path, "index.jsonl")
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.thread = None
+        self.segment = None
+        self.written = self.bytes = 0
+
+    def start(self):
+        if self.thread is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.thread = threading.Thread(target=self._run, name="odds-archive", daemon=True)
+            self.thread.start()
+        return self
+
+    def record(self, league, data, fetched=None):
+        if self.thread is None or not data:
+            return
+        fetched = fetched or datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.queue.put((league, fetched, data))
+
+    def _current_segment(self, day):
+        if self.segment and self.segment[0] == day:
+            name = self.segment[1]
+            if os.path.getsize(os.path.join(self.path, name)) < SEGMENT_MAX_BYTES:
+                return name
+        part = 0
+        while True:
+            name = _segment_name(day, part)
+            full = os.path.join(self.path, name)
+            if not os.path.exists(full) or os.path.getsize(full) < SEGMENT_MAX_BYTES:
+                self.segment = (day, name)
+                return name
+            part += 1
+
+    def _write(self, league, fetched, data):
+        line = (json.dumps({"t": fetched, "league": league, "events": data}, ensure_ascii=False) + "\n").encode("utf-8")
+        member = gzip.compress(line, compresslevel=6)
+        name = self._current_segment(fetched[:10].replace("-", ""))
+        with open(os.path.join(self.path, name), "ab") as f:
+            offset = f.tell()
+            f.write(member)
+        entry = {"t": fetched, "league": league, "seg": name, "off": offset, "len": len(member),
+                 "events": [e.get('id') for e in data]}
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.written += 1
+        self.bytes += len(member)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                print(f"  ⚠️ Archiwum kursów: błąd zapisu ({e})")
+            finally:
+                self.queue.task_done()
+
+    def close(self):
+        if self.thread is None:
+            return "🗄 Archiwum kursów: wyłączone"
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        try:
+            prune(self.path)
+        except OSError as e:
+            print(f"  ⚠️ Archiwum kursów: błąd czyszczenia starych segmentów ({e})")
+        return f"🗄 Archiwum kursów: zapisano {self.written} odpowiedzi ({self.bytes / 1024:.0f} KB gzip)"
+
+def get_recorder():
+    """Rejestrator dla start.py (None gdy ODDS_ARCHIVE=0)."""
+    return OddsRecorder().start() if ENABLED else None
+
+# ================= ODCZYT =================
+class OddsArchive:
+    """Odczyt archiwum przez indeks: po lidze, po id meczu, pojedyncze odpowiedzi."""
+
+    def __init__(self, path=ARCHIVE_DIR):
+        self.path = path
+        self.entries, self.by_league, self.by_event = [], {}, {}
+        index_path = os.path.join(path, "index.jsonl")
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue        # urwana ostatnia linia po awarii
+                n = len(self.entries)
+                self.entries.append(entry)
+                self.by_league.setdefault(entry["league"], []).append(n)
+                for event_id in entry["events"]:
+                    self.by_event.setdefault(event_id, []).append(n)
+
+    def read(self, entry):
+        """Jedna odpowiedź /odds: seek do offsetu i rozpakowanie tylko jej członu gzip."""
+        with open(os.path.join(self.path, entry["seg"]), "rb") as f:
+            f.seek(entry["off"])
+            return json.loads(gzip.decompress(f.read(entry["len"])))
+
+    def league(self, league, since=None):
+        """(czas, lista meczów) kolejnych odpowiedzi dla ligi."""
+        for n in self.by_league.get(league, []):
+            entry = self.entries[n]
+            if since is None or entry["t"] >= since:
+                yield entry["t"], self.read(entry)["events"]
+
+    def event(self, event_id):
+        """Historia kursów jednego meczu: [(czas, mecz z bukmacherami), ...]."""
+        snapshots = []
+        for n in self.by_event.get(event_id, []):
+            entry = self.entries[n]
+            for event in self.read(entry)["events"]:
+                if event.get('id') == event_id:
+                    snapshots.append((entry["t"], event))
+        return snapshots
+
+def prune(path=ARCHIVE_DIR, keep_days=KEEP_DAYS):
+    """Usuwa segmenty starsze niż keep_days i ich wpisy z indeksu."""
+    index_path = os.path.join(path, "index.jsonl")
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=keep_days)).strftime("%Y%m%d")
+    old = [n for n in os.listdir(path) if n.startswith("odds-") and n[5:13] < cutoff]
+    if not old:
+        return 0
+    old_set = set(old)
+    if os.path.exists(index_path):
+        kept = []
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue        # urwana linia po awarii - i tak nieczytelna dla OddsArchive
+                if entry.get("seg") not in old_set:
+                    kept.append(line)
+        tmp = index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(tmp, index_path)
+    for name in old:
+        os.remove(os.path.join(path, name))
+    return len(old)
+
+if __name__ == "__main__":
+    archive = OddsArchive()
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if cmd == "event" and len(sys.argv) > 2:
+        for t, event in archive.event(sys.argv[2]):
+            prices = [o['price'] for b in event.get('bookmakers', []) for m in b.get('markets', []) for o in m.get('outcomes', [])]
+            print(f"{t} | {event.get('home_team')} - {event.get('away_team')} | bukmacherów {len(event.get('bookmakers', []))} | max kurs {max(prices) if prices else '-'}")
+    elif cmd == "league" and len(sys.argv) > 2:
+        for t, events in archive.league(sys.argv[2]):
+            print(f"{t} | meczów {len(events)}")
+    elif cmd == "stats":
+        segments = sorted({e["seg"] for e in archive.entries})
+        size = sum(os.path.getsize(os.path.join(ARCHIVE_DIR, s)) for s in segments if os.path.exists(os.path.join(ARCHIVE_DIR, s)))
+        print(f"🗄 Archiwum: {len(archive.entries)} odpowiedzi, {len(archive.by_event)} meczów, "
+              f"{len(archive.by_league)} lig, {len(segments)} segmentów ({size / 1024:.0f} KB)")
+    else:
+        print("Użycie: python odds_archive.py [stats | event <id> | league <klucz_ligi>]")
@@ -0,0 +1,54 @@
+import sys
+import metrics
+import http_client
+import response_cache
+from datetime import datetime
+from api_keys import KeyManager
+from league_index import load_index
+from storage import CachedRepository, get_repository
+import settle
+import start
+import publish
+
+# Jeden proces zamiast settle.py + start.py + publish.py w auto.yml:
+# rozliczenie -> raport -> skan -> dashboard na wspólnym stanie (klucze, sesja HTTP,
+# historia, kupony, indeks lig wczytane raz). Stan kluczy, cache API i kupony po
+# skanie zapisywane raz na końcu.
+# Użycie: python pipeline.py [--no-publish]
+
+def run(publish_dashboard=True):
+    print(f"🧩 --- PIPELINE: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---")
+    metrics.reset("pipeline")
+
+    with metrics.span("load"):
+        km = KeyManager()
+        repo = CachedRepository(get_repository())
+        index = load_index()
+
+    try:
+        # 1. ROZLICZANIE + RAPORT (stats.json)
+        with metrics.span("stage_settle"):
+            settle.settle_matches(km=km, repo=repo, index=index)
+
+        # 2. SZUKANIE NOWYCH TYPÓW
+        with metrics.span("stage_scan"):
+            start.main(km=km, repo=repo, league_index=index)
+
+        with metrics.span("save"):
+            repo.flush()
+
+        # 3. PLIKI DASHBOARDU (data/)
+        if publish_dashboard:
+            with metrics.span("stage_publish"):
+                publish.publish(repo)
+    finally:
+        # Także po błędzie - zużycie limitu i kupony już wysłanych typów nie mogą zginąć
+        with metrics.span("save"):
+            repo.close()
+            km.save()
+            response_cache.save()
+        print(http_client.latency_summary())
+        print(metrics.write())
+
+if __name__ == "__main__":
+    run(publish_dashboard="--no-publish" not in sys.argv[1:])
@@ -0,0 +1,130 @@
+import os
+import re
+import json
+import hashlib
+from datetime import datetime, timezone
+from history_store import atomic_write_json
+from stats_engine import graph_order
+from storage import get_repository
+
+# Gotowe, małe pliki dla index.html - strona nie pobiera już całej historii
+PUBLISH_DIR = "data"
+LEAGUES_DIR = os.path.join(PUBLISH_DIR, "leagues")
+MANIFEST_FILE = os.path.join(PUBLISH_DIR, "manifest.json")
+STATS_FILE = "stats.json"
+RECENT_LIMIT = 10
+UPCOMING_LIMIT = 10
+GRAPH_POINTS = 100
+
+def _load(path, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return default
+
+def _write(path, data):
+    """Zapis tylko przy zmianie treści - bez zbędnych commitów z workflow."""
+    if _load(path, None) == data:
+        return False
+    atomic_write_json(path, data, indent=None)
+    return True
+
+def shard_name(sport):
+    return re.sub(r"[^a-z0-9_]+", "_", (sport or "inne").lower()) + ".json"
+
+def is_match(m):
+    return m.get('sport') != "FINANCE" and m.get('status') != "ARCHIVED"
+
+def slim(m):
+    return {k: m[k] for k in ("home", "away", "sport", "time", "odds", "score", "profit", "status") if m.get(k) is not None}
+
+def build(history, coupons, stats, now=None):
+    """Zwraca {ścieżka: dane} wszystkich plików dashboardu."""
+    now = now or datetime.now(timezone.utc)
+    matches = [m for m in history if is_match(m)]
+    withdrawn = sum(abs(float(m.get('profit') or 0)) for m in history
+                    if (m.get('sport') == "FINANCE" or m.get('type') == "WITHDRAW") and m.get('status') != "ARCHIVED")
+
+    leagues = {}
+    for m in matches:
+        row = leagues.setdefault(m.get('sport'), {"profit": 0.0, "matches": []})
+        row["profit"] += float(m.get('profit') or 0)
+        row["matches"].append(m)
+
+    summary_leagues = sorted((
+        {"sport": sport, "profit": round(row["profit"], 2), "count": len(row["matches"]), "file": shard_name(sport)}
+        for sport, row in leagues.items()
+    ), key=lambda x: -x["profit"])
+
+    # Daty pod osią wykresu: czasy ostatnich rekordów krzywej kapitału (po czasie meczu, jak krzywa)
+    graph = stats.get("history_graph", [])
+    tail = graph_order(history)[-len(graph):] if graph else []
+    labels = [""] * (len(graph) - len(tail)) + [m.get('time') or "" for m in tail]
+
+    def start_time(c):
+        return c.get('time') or ""
+    upcoming = sorted(coupons, key=start_time)
+    upcoming = [c for c in upcoming if start_time(c) >= now.isoformat()[:19]] or upcoming
+
+    files = {
+        os.path.join(PUBLISH_DIR, "summary.json"): dict(stats, **{
+            "withdrawn": round(withdrawn, 2),
+            "matches": len(matches),
+            "active": len(coupons),
+            "graph_labels": labels,
+        }),
+        os.path.join(PUBLISH_DIR, "recent.json"): [slim(m) for m in reversed(matches[-RECENT_LIMIT:])],
+        os.path.join(PUBLISH_DIR, "upcoming.json"): [slim(c) for c in upcoming[:UPCOMING_LIMIT]],
+        os.path.join(PUBLISH_DIR, "leagues.json"): summary_leagues,
+    }
+    for sport, row in leagues.items():
+        files[os.path.join(LEAGUES_DIR, shard_name(sport))] = [slim(m) for m in reversed(row["matches"])]
+    return files
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def write_manifest(paths, now=None):
+    """manifest.json: skrót treści i czas zmiany każdego pliku.
+
+    Strona odpytuje tylko manifest i pobiera pliki, których skrót się zmienił.
+    """
+    stamp = (now or datetime.now(timezone.utc)).isoformat(timespec="seconds")
+    old = _load(MANIFEST_FILE, {}).get("files", {})
+    files = {}
+    for path in sorted(paths):
+        name = os.path.relpath(path, PUBLISH_DIR).replace(os.sep, "/")
+        digest = file_hash(path)
+        prev = old.get(name, {})
+        updated = prev.get("updated") if prev.get("hash") == digest else stamp
+        files[name] = {"hash": digest, "updated": updated or stamp, "size": os.path.getsize(path)}
+
+    if files == old:
+        return False
+    atomic_write_json(MANIFEST_FILE, {"generated": stamp, "files": files}, indent=None)
+    return True
+
+def publish(repo=None):
+    repo = repo or get_repository()
+    files = build(repo.load_history(), repo.load_coupons(), _load(STATS_FILE, {}))
+    os.makedirs(LEAGUES_DIR, exist_ok=True)
+
+    changed = sum(_write(path, data) for path, data in files.items())
+    # Ligi, które zniknęły z historii (np. po czyszczeniu) - usuwamy stare pliki
+    removed = 0
+    for name in os.listdir(LEAGUES_DIR):
+        path = os.path.join(LEAGUES_DIR, name)
+        if path not in files:
+            os.remove(path)
+            removed += 1
+
+    write_manifest(files)
+    size = sum(os.path.getsize(p) for p in files)
+    print(f"🗂 Dashboard: {len(files)} plików ({size / 1024:.0f} KB), zmienionych {changed}, usuniętych {removed}")
+
+if __name__ == "__main__":
+    publish()
@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import threading
+import metrics
+from collections import OrderedDict
+
+# Cache odpowiedzi The Odds API - powtórne uruchomienie w oknie TTL nie zużywa limitu
+CACHE_FILE = "api_cache.json"
+ENABLED = os.getenv("API_CACHE", "1") != "0"
+TTL = {
+    "odds": 10 * 60,        # kursy szybko się zmieniają
+    "scores": 30 * 60,
+    "events": 60 * 60,
+    "sports": 24 * 3600,    # katalog lig
+}
+DEFAULT_TTL = 10 * 60
+MAX_ENTRIES = 300
+MAX_BYTES = 20 * 1024 * 1024
+
+class CachedResponse:
+    """Minimalny odpowiednik requests.Response dla trafień z cache."""
+    from_cache = True
+
+    def __init__(self, body):
+        self.status_code = 200
+        self.headers = {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+def endpoint_of(path):
+    return path.strip("/").split("/")[-1]
+
+def make_key(path, params):
+    # apiKey nie jest częścią klucza - każdy klucz zwraca te same dane
+    items = sorted((k, str(v)) for k, v in (params or {}).items() if k != "apiKey")
+    return path.strip("/") + "?" + "&".join(f"{k}={v}" for k, v in items)
+
+class ResponseCache:
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        self.entries = OrderedDict()
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = OrderedDict(json.load(f))
+            except:
+                pass
+
+    def get(self, path, params):
+        key = make_key(path, params)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and time.time() - entry["t"] < entry["ttl"]:
+                self.entries.move_to_end(key)    # LRU: ostatnio używane na koniec
+                self.hits += 1
+                return CachedResponse(entry["body"])
+            self.misses += 1
+            return None
+
+    def put(self, path, params, body):
+        key, ttl = make_key(path, params), TTL.get(endpoint_of(path), DEFAULT_TTL)
+        with self.lock:
+            self.entries[key] = {"t": time.time(), "ttl": ttl, "body": body}
+            self.entries.move_to_end(key)
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, e in self.entries.items() if now - e["t"] >= e["ttl"]]:
+            del self.entries[key]
+        sizes = {k: len(json.dumps(e["body"])) for k, e in self.entries.items()}
+        total = sum(sizes.values())
+        while self.entries and (len(self.entries) > MAX_ENTRIES or total > MAX_BYTES):
+            key, _ = self.entries.popitem(last=False)
+            total -= sizes[key]
+            self.evictions += 1
+
+    def save(self):
+        with self.lock:
+            self._evict()
+            data = list(self.entries.items())
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        metrics.file_io("write", self.path)
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0
+        return f"💾 Cache API: {self.hits} trafień / {self.misses} chybień ({rate:.0f}%), usunięto {self.evictions}"
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Wspólna instancja cache dla procesu (None gdy API_CACHE=0)."""
+    global _cache
+    if not ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+    return _cache
+
+def save():
+    if _cache is not None:
+        _cache.save()
+        print(_cache.summary())
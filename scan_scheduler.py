@@ -0,0 +1,127 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from api_keys import odds_request
+from history_store import atomic_write_json
+from coupon_store import parse_time
+
+# Terminarz lig - start.py pyta /odds tylko o ligi, w których coś jest do zagrania.
+# Terminarz budujemy z odpowiedzi /odds i z /events (nie zużywa limitu kluczy).
+CALENDAR_FILE = "fixture_calendar.json"
+ENABLED = os.getenv("SCAN_SCHEDULER", "1") != "0"
+WINDOW = timedelta(hours=48)            # jak max_future w start.py
+CALENDAR_TTL = timedelta(hours=12)      # co tyle odświeżamy terminarz z /events
+REFRESH_AFTER = timedelta(hours=3)      # kursy meczów w oknie - ponowne pobranie po tylu godzinach
+WORKERS = 8
+
+def _iso(t):
+    return t.isoformat(timespec="seconds")
+
+class FixtureCalendar:
+    """{liga: {"events": {id: start}, "events_checked": czas /events, "odds_checked": czas /odds}}"""
+
+    def __init__(self, path=CALENDAR_FILE):
+        self.path = path
+        self.leagues = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.leagues = json.load(f)
+            except:
+                self.leagues = {}
+
+    def save(self):
+        atomic_write_json(self.path, self.leagues, indent=1)
+
+    def _store(self, league, events, field, now):
+        entry = self.leagues.setdefault(league, {"events": {}})
+        fixtures = {}
+        for event in events:
+            start = parse_time(event.get('commence_time') or '')
+            if event.get('id') and start and start > now:
+                fixtures[event['id']] = _iso(start)
+        entry["events"] = fixtures
+        entry[field] = _iso(now)
+
+    def record_odds(self, league, data, now):
+        """Po pobraniu /odds: odpowiedź zawiera pełną listę nadchodzących meczów ligi."""
+        self._store(league, data or [], "odds_checked", now)
+
+    def fetch_events(self, league, km):
+        """Lista meczów z /events (bez zmiany terminarza) albo None przy błędzie."""
+        resp, _ = odds_request(km, f"sports/{league}/events", {"dateFormat": "iso"}, log=[])
+        if resp is None or resp.status_code != 200:
+            return None
+        return resp.json()
+
+    def record_events(self, league, events, now):
+        self._store(league, events, "events_checked", now)
+
+    def refresh_events(self, league, km, now):
+        events = self.fetch_events(league, km)
+        if events is None:
+            return False
+        self.record_events(league, events, now)
+        return True
+
+    def _checked(self, entry, field):
+        return parse_time(entry.get(field) or '')
+
+    def needs_events(self, league, now):
+        entry = self.leagues.get(league)
+        if not entry:
+            return True
+        checked = [t for t in (self._checked(entry, "events_checked"), self._checked(entry, "odds_checked")) if t]
+        return not checked or now - max(checked) >= CALENDAR_TTL
+
+    def decide(self, league, already_sent, now, refresh_after=REFRESH_AFTER):
+        """Powód pominięcia ligi albo None, gdy trzeba pobrać kursy."""
+        entry = self.leagues.get(league)
+        if not entry or not (entry.get("events_checked") or entry.get("odds_checked")):
+            return None
+        starts = {event_id: parse_time(t) for event_id, t in entry["events"].items()}
+        window = {event_id: t for event_id, t in starts.items() if t and now < t < now + WINDOW}
+        if not window:
+            later = [t for t in starts.values() if t and t >= now + WINDOW]
+            if later:
+                return f"brak meczów w oknie 48h (najbliższy: {min(later).strftime('%d.%m %H:%M')} UTC)"
+            return "brak meczów w terminarzu (przerwa w rozgrywkach)"
+
+        open_events = [t for event_id, t in window.items() if event_id not in already_sent]
+        if not open_events:
+            return f"wszystkie mecze w oknie 48h ({len(window)}) mają już typ"
+
+        odds_checked = self._checked(entry, "odds_checked")
+        if odds_checked is None:
+            return None
+        # Mecz wszedł do okna od ostatniego /odds - kursów jeszcze nie oceniliśmy
+        if any(t >= odds_checked + WINDOW for t in open_events):
+            return None
+        age = now - odds_checked
+        if age >= refresh_after:
+            return None
+        return f"kursy {len(open_events)} meczów sprzed {int(age.total_seconds() // 60)} min (odświeżenie co {refresh_after.total_seconds() / 3600:g} h)"
+
+    def plan(self, leagues, already_sent, km, now=None, workers=WORKERS):
+        """{liga: powód} dla lig do pominięcia. Nieaktualne terminarze odświeżamy z /events."""
+        now = now or datetime.now(timezone.utc)
+        stale = [league for league in leagues if self.needs_events(league, now)]
+        if stale:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                list(pool.map(lambda league: self.refresh_events(league, km, now), stale))
+        skipped = {}
+        for league in leagues:
+            reason = self.decide(league, already_sent, now)
+            if reason:
+                skipped[league] = reason
+        return skipped
+
+if __name__ == "__main__":
+    # Podgląd decyzji na zapisanym terminarzu (bez zapytań do API)
+    from storage import get_repository
+    calendar = FixtureCalendar()
+    now = datetime.now(timezone.utc)
+    sent = {c['id'] for c in get_repository().load_coupons()}
+    for league in sorted(calendar.leagues):
+        print(f"{league}: {calendar.decide(league, sent, now) or '📡 do skanu'}")
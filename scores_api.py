@@ -0,0 +1,61 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from api_keys import odds_request
+
+# Wyniki meczów z /scores - paczki eventIds zamiast jednego zapytania na mecz
+SCORES_CHUNK = int(os.getenv("SCORES_CHUNK", "40"))
+SCORES_WORKERS = int(os.getenv("SCORES_WORKERS", "4"))
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), max(1, size))]
+
+def get_scores(km, sport, event_ids=None, days_from=None, use_cache=True):
+    """Jedno zapytanie /scores. Zwraca listę meczów, [] przy błędzie API albo None gdy brak kluczy."""
+    params = {}
+    if event_ids:
+        params["eventIds"] = ",".join(event_ids)
+    if days_from:
+        params["daysFrom"] = days_from
+    resp, _ = odds_request(km, f"sports/{sport}/scores", params, use_cache=use_cache)
+    if resp is None:
+        return None
+    if resp.status_code != 200:
+        print(f"  ⚠️ {sport}: błąd /scores {resp.status_code}")
+        return []
+    return resp.json()
+
+def fetch_scores(km, ids_by_sport, days_from=None, chunk_size=SCORES_CHUNK, workers=SCORES_WORKERS, use_cache=True):
+    """Pobiera wyniki dla {sport: [id, ...]} paczkami, sporty równolegle.
+
+    Zwraca (wyniki {id: mecz}, niepobrane {sport: [id, ...]}) - niepobrane to
+    paczki pominięte po wyczerpaniu limitu na wszystkich kluczach (punkt wznowienia).
+    use_cache=False: zawsze świeże wyniki (ponowne próby daemon.py częstsze niż TTL cache).
+    """
+    plan = {sport: chunked(list(ids), chunk_size) for sport, ids in ids_by_sport.items() if ids}
+    total = sum(len(c) for c in plan.values())
+    results, pending = {}, {}
+    lock = threading.Lock()
+    done = [0]
+    out_of_quota = threading.Event()
+
+    def run_sport(sport):
+        for n, chunk in enumerate(plan[sport]):
+            matches = None if out_of_quota.is_set() else get_scores(km, sport, chunk, days_from, use_cache)
+            with lock:
+                if matches is None:
+                    out_of_quota.set()
+                    pending[sport] = [i for c in plan[sport][n:] for i in c]
+                    return
+                for match in matches:
+                    results[match['id']] = match
+                done[0] += 1
+                print(f"  📦 [{done[0]}/{total}] {sport}: paczka {n+1}/{len(plan[sport])}, wyników {len(matches)}")
+
+    if total:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(run_sport, plan))
+
+    if pending:
+        print(f"  ⛔ Limit API wyczerpany - niepobrane mecze: {sum(len(v) for v in pending.values())}")
+    return results, pending
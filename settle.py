@@ -1,12 +1,15 @@
 import os
-import json
-import requests
-from datetime import datetime, timezone, timedelta
-
-# --- KONFIGURACJA PLIKÓW ---
-COUPONS_FILE = "coupons.json"
-HISTORY_FILE = "history.json"
-STATS_JSON_FILE = "stats.json"
+import metrics
+import http_client
+import response_cache
+from api_keys import KeyManager
+from scores_api import fetch_scores
+from coupon_store import ARCHIVE_FILE, CouponStore, archive_coupons
+from settle_planner import plan_settlement
+from telegram_outbox import TELEGRAM_API
+from league_index import update_index
+from storage import get_repository
+from stats_engine import analyze, write_stats_json
 
 def get_secret(name):
     val = os.environ.get(name) or os.getenv(name)
@@ -16,138 +19,119 @@ def send_telegram_results(message):
     token = get_secret("T_TOKEN")
     chat = get_secret("T_CHAT_RESULTS") or get_secret("T_CHAT")
     if not token or not chat: return
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
+    url = f"{TELEGRAM_API}/bot{token}/sendMessage"
     payload = {"chat_id": chat, "text": message, "parse_mode": "HTML"}
-    try: requests.post(url, json=payload, timeout=15)
-    except: pass
-
-def get_all_api_keys():
-    keys = []
-    for i in range(1, 11):
-        key_name = "ODDS_KEY" if i == 1 else f"ODDS_KEY_{i}"
-        val = os.getenv(key_name)
-        if val: keys.append(val)
-    return keys
-
-def get_match_results(sport, keys):
-    for key in keys:
-        # POPRAWKA: Usunięto końcowy slash, aby uniknąć błędu 404
-        url = f"https://api.the-odds-api.com/v4/sports/{sport}/scores"
-        params = {"apiKey": key, "daysFrom": 3}
-        try:
-            resp = requests.get(url, params=params, timeout=15)
-            if resp.status_code == 200: return resp.json()
-        except: continue
-    return None
-
-def generate_report(history, remaining_count):
-    now = datetime.now(timezone.utc)
-    base_capital = 5000.0
-    
-    total_profit = 0.0
-    total_staked = 0.0
-    profit_24h = 0.0
-    graph_data = [base_capital]
-    
-    history_sorted = sorted(history, key=lambda x: x.get('time', ''))
-
-    for m in history_sorted:
-        p = float(m.get('profit', 0))
-        s = float(m.get('stake') or m.get('stawka') or 250)
-        
-        total_profit += p
-        total_staked += s
-        graph_data.append(round(base_capital + total_profit, 2))
-        
-        t_str = m.get('time')
-        if t_str:
-            try:
-                m_time = datetime.fromisoformat(t_str.replace("Z", "+00:00"))
-                if (now - m_time) < timedelta(hours=24):
-                    profit_24h += p
-            except: continue
-
-    bankroll = base_capital + total_profit
-    yield_val = (total_profit / total_staked * 100) if total_staked > 0 else 0
-    
-    stats_data = {
-        "bankroll": round(bankroll, 2),
-        "zysk_total": round(total_profit, 2),
-        "zysk_24h": round(profit_24h, 2),
-        "obrot": round(total_staked, 2),
-        "yield": round(yield_val, 2),
-        "last_sync": now.strftime("%d.%m.%Y %H:%M"),
-        "upcoming_val": remaining_count,
-        "history_graph": graph_data[-100:]
-    }
-    with open(STATS_JSON_FILE, "w", encoding="utf-8") as f:
-        json.dump(stats_data, f, indent=4)
-
-    wins = sum(1 for m in history if m.get('status') == 'WIN')
-    total_matches = sum(1 for m in history if m.get('status') in ['WIN', 'LOSS'])
-    accuracy = (wins / total_matches * 100) if total_matches > 0 else 0
+    resp = http_client.post(url, json=payload)
+    if resp is None or resp.status_code != 200:
+        print(f"⚠️ Telegram: nie wysłano raportu ({resp.status_code if resp is not None else 'brak połączenia'})")
+
+def get_match_results(active_coupons, km, use_cache=True):
+    # Wyniki tylko dla naszych meczów: paczki eventIds per sport, sporty równolegle
+    ids_by_sport = {}
+    for c in active_coupons: ids_by_sport.setdefault(c['sport'], []).append(c['id'])
+    results_map, _ = fetch_scores(km, ids_by_sport, days_from=3, use_cache=use_cache)
+    return results_map
+
+def generate_report(remaining_count, full=False, repo=None):
+    # Liczniki przyrostowe - przetwarzamy tylko rozliczenia od ostatniego przebiegu
+    result = analyze(full=full, repo=repo)
+    write_stats_json(result, remaining_count)
 
     report = [
         "📊 <b>DASHBOARD UPDATED</b>",
-        f"🏦 <b>BANKROLL:</b> {round(bankroll, 2)} PLN",
-        f"💰 Zysk Total: {round(total_profit, 2)} PLN",
-        f"📅 Ostatnie 24h: {round(profit_24h, 2)} PLN",
-        f"📈 Yield: {round(yield_val, 2)}% | Celność: {round(accuracy, 1)}%",
+        f"🏦 <b>BANKROLL:</b> {round(result.bankroll, 2)} PLN",
+        f"💰 Zysk Total: {round(result.profit, 2)} PLN",
+        f"📅 Ostatnie 24h: {round(result.profit_24h, 2)} PLN",
+        f"📈 Yield: {round(result.yield_pct, 2)}% | Celność: {round(result.accuracy, 1)}%",
         "━━━━━━━━━━━━━━━",
         "📝 <b>OSTATNIE:</b>"
     ]
-    for m in reversed(history[-5:]):
+    for m in reversed(result.recent[-5:]):
         status = "✅" if m.get('status') == 'WIN' else "❌"
         report.append(f"{status} {m.get('home')} - {m.get('away')} ({m.get('profit')} PLN)")
 
     send_telegram_results("\n".join(report))
 
-def settle_matches():
-    api_keys = get_all_api_keys()
-    if not os.path.exists(COUPONS_FILE): return
-    with open(COUPONS_FILE, "r", encoding="utf-8") as f: active_coupons = json.load(f)
-    if not active_coupons: return
-
-    history = []
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, "r", encoding="utf-8") as f: history = json.load(f)
-        except: pass
-
-    remaining_coupons, new_settlements = [], 0
-    results_map = {}
+def settle_coupon(coupon, match_data):
+    """Rekord historii dla zakończonego meczu albo None, gdy wyniku jeszcze nie ma."""
+    if not match_data or not match_data.get('completed'): return None
+    scores = {s['name']: int(s['score']) for s in match_data.get('scores') or []}
+    h_score = scores.get(match_data['home_team'], 0)
+    a_score = scores.get(match_data['away_team'], 0)
     
-    # Automatyczne pobieranie sportów z aktywnych kuponów (już z nowymi nazwami lig)
-    sports_to_check = list(set(c['sport'] for c in active_coupons))
-
-    for sport in sports_to_check:
-        res = get_match_results(sport, api_keys)
-        if res:
-            for match in res: results_map[match['id']] = match
-
-    for coupon in active_coupons:
-        match_data = results_map.get(coupon['id'])
-        if match_data and match_data.get('completed'):
-            scores = {s['name']: int(s['score']) for s in match_data.get('scores', [])}
-            h_score = scores.get(match_data['home_team'], 0)
-            a_score = scores.get(match_data['away_team'], 0)
-            
-            won = False
-            if coupon['outcome'] == match_data['home_team'] and h_score > a_score: won = True
-            elif coupon['outcome'] == match_data['away_team'] and a_score > h_score: won = True
-
-            profit = round((float(coupon['stake']) * float(coupon['odds'])) - float(coupon['stake']) if won else -float(coupon['stake']), 2)
-            
-            history.append({**coupon, "profit": profit, "status": "WIN" if won else "LOSS", "score": f"{h_score}:{a_score}"})
-            new_settlements += 1
-        else:
-            remaining_coupons.append(coupon)
-
-    if new_settlements > 0:
-        with open(HISTORY_FILE, "w", encoding="utf-8") as f: json.dump(history, f, indent=4)
-        with open(COUPONS_FILE, "w", encoding="utf-8") as f: json.dump(remaining_coupons, f, indent=4)
+    won = False
+    if coupon['outcome'] == match_data['home_team'] and h_score > a_score: won = True
+    elif coupon['outcome'] == match_data['away_team'] and a_score > h_score: won = True
+
+    profit = round((float(coupon['stake']) * float(coupon['odds'])) - float(coupon['stake']) if won else -float(coupon['stake']), 2)
     
-    generate_report(history, len(remaining_coupons))
+    return {**coupon, "profit": profit, "status": "WIN" if won else "LOSS", "score": f"{h_score}:{a_score}"}
+
+def settle_matches(km=None, repo=None, index=None, report_unchanged=True, use_cache=True, hold=()):
+    """Rozlicza zakończone mecze. pipeline.py/daemon.py podają wspólne km/repo/indeks lig
+    - wtedy stan kluczy i cache zapisują same. Zwraca liczbę rozliczonych kuponów.
+
+    report_unchanged=False: raport (stats.json + Telegram) tylko gdy coś się zmieniło.
+    use_cache=False: /scores bez cache odpowiedzi (ponowne próby daemon.py).
+    hold: id kuponów, o które tym razem nie pytamy (odstęp ponownych prób w daemon.py).
+    """
+    standalone = km is None
+    if standalone:
+        metrics.reset("settle")
+        km = KeyManager()
+    repo = repo or get_repository()
+    with metrics.span("load"):
+        store = CouponStore(repo.load_coupons())
+    if not store: return 0
+
+    # Planowanie: tylko mecze, które mogły się skończyć; stare (poza daysFrom) do archiwum
+    with metrics.span("plan"):
+        due, waiting, stale = plan_settlement(store)
+        due = [c for c in due if c['id'] not in hold]
+    print(f"🗓 Plan rozliczeń: do sprawdzenia {len(due)}, w trakcie/przed startem {len(waiting)}, poza oknem API {len(stale)}")
+
+    settled = []
+    with metrics.span("scores"):
+        results_map = get_match_results(due, km, use_cache) if due else {}
+
+    with metrics.span("settle"):
+        for coupon in due:
+            record = settle_coupon(coupon, results_map.get(coupon['id']))
+            if record:
+                settled.append(record)
+                metrics.count("settled", league=coupon.get('sport'))
+    metrics.count("stale", len(stale))
+
+    # Kolejność pozostałych kuponów bez zmian
+    store.remove([c['id'] for c in settled] + [c['id'] for c in stale])
+    remaining_coupons = store.coupons()
+
+    if standalone:
+        with metrics.span("save"):
+            km.save()
+            response_cache.save()
+        print(http_client.latency_summary())
+
+    with metrics.span("save"):
+        if settled:
+            repo.append_history(settled)
+            update_index(settled, index)
+        if stale:
+            total = archive_coupons(stale)
+            print(f"🧰 Przeniesiono {len(stale)} kuponów do {ARCHIVE_FILE} (razem: {total}) - rozlicza je: python fix_history.py stale")
+        if settled or stale:
+            repo.save_coupons(remaining_coupons)
+        # Historia i kupony razem na dysk przed raportem - bez ryzyka podwójnego rozliczenia.
+        # Wspólne repo (pipeline.py/daemon.py) zapisuje wywołujący - raz, po wszystkich etapach.
+        if standalone:
+            repo.flush()
+
+    if report_unchanged or settled or stale:
+        with metrics.span("report"):
+            generate_report(len(remaining_coupons), repo=repo)
+    if standalone:
+        print(metrics.write())
+    return len(settled)
 
 if __name__ == "__main__":
     settle_matches()
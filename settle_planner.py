@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+from coupon_store import CouponStore
+
+# Planowanie rozliczeń: pytamy API tylko o mecze, które mogły się już skończyć.
+# Indeksy czasu i archiwum przeterminowanych kuponów: coupon_store.py
+
+def plan_settlement(coupons, now=None):
+    """Dzieli kupony na (do sprawdzenia, jeszcze nie skończone, poza oknem API).
+
+    Zapytania po indeksie czasu końca meczu (CouponStore) - zdejmujemy tylko te,
+    których koniec już minął. Kupony starsze niż okno daysFrom idą do archiwum.
+    """
+    now = now or datetime.now(timezone.utc)
+    store = coupons if isinstance(coupons, CouponStore) else CouponStore(coupons)
+    stale = store.expired(now)
+    stale_ids = {c['id'] for c in stale}
+    due = [c for c in store.due(now) if c['id'] not in stale_ids]
+    done = stale_ids | {c['id'] for c in due}
+    waiting = [c for c in store.by_finish() if c['id'] not in done]
+    return due, waiting, stale
+
+def next_due(coupons):
+    """Najbliższy spodziewany koniec meczu wśród kuponów (albo None)."""
+    store = coupons if isinstance(coupons, CouponStore) else CouponStore(coupons)
+    return store.next_finish()
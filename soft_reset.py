@@ -1,6 +1,6 @@
 import json
-import os
 from datetime import datetime
+from storage import get_repository
 
 def soft_reset():
     now = datetime.now().strftime("%d.%m.%Y %H:%M")
@@ -23,16 +23,15 @@ def soft_reset():
 
     # 2. Oznaczamy stare mecze w historii jako "ARCHIVE" 
     # Dzięki temu zostaną w pliku (bot je widzi), ale Dashboard może je ignorować
-    if os.path.exists("history.json"):
-        with open("history.json", "r", encoding="utf-8") as f:
-            history = json.load(f)
+    repo = get_repository()
+    if repo.has_history():
+        history = repo.load_history()
         
         for m in history:
             if m.get("status") != "ARCHIVED":
                 m["status"] = "ARCHIVED" # Archiwizujemy stare wyniki finansowe
 
-        with open("history.json", "w", encoding="utf-8") as f:
-            json.dump(history, f, indent=4)
+        repo.write_history(history)
 
     print(f"✅ Miękki reset zakończony. Bankroll: {new_start_balance} PLN. Historia zachowana.")
 
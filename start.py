@@ -1,7 +1,17 @@
 import os
-import requests
-import json
+import metrics
+import http_client
+import response_cache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from api_keys import KeyManager, odds_request
+from league_index import load_index
+from value_engine import best_value_loop
+from telegram_outbox import Outbox
+from storage import get_repository
+from coupon_store import CouponStore
+from odds_archive import get_recorder
+from scan_scheduler import ENABLED as SCHEDULER_ENABLED, FixtureCalendar
 
 # ================= KONFIGURACJA =================
 SPORTS_CONFIG = {
@@ -33,232 +43,247 @@ SPORTS_CONFIG = {
     "soccer_usa_mls": "🇺🇸"
 }
 
-HISTORY_FILE = "history.json"
-COUPONS_FILE = "coupons.json"
-KEY_STATE_FILE = "key_index.txt"
 BASE_STAKE = 250
+# Reguły stawki i progu value (backtest.py podmienia je przy przeszukiwaniu siatki)
+STAKE_RULES = {
+    "base_stake": BASE_STAKE,
+    "threshold": 1.035,
+    "loss_limit": -700, "loss_multiplier": 0.5, "loss_threshold": 1.08,
+    "good_limit": 1000, "good_multiplier": 1.3,
+    "top_limit": 3000, "top_multiplier": 1.6,
+    "hockey_discount": 0.01, "hockey_bonus": 1.25,
+}
+# Ile lig skanujemy równolegle (1 = stary tryb sekwencyjny)
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "8"))
 
 # ================= POMOCNICZE =================
-def get_secret(name):
-    val = os.environ.get(name) or os.getenv(name)
-    return str(val).strip() if val else None
-
-def send_telegram(message, mode="HTML"):
-    token = get_secret("T_TOKEN")
-    chat = get_secret("T_CHAT")
-    if not token or not chat:
-        return
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {"chat_id": chat, "text": message, "parse_mode": mode}
-    try:
-        requests.post(url, json=payload, timeout=15)
-    except:
-        pass
+def get_smart_stake(league_key, index=None, rules=None):
+    r = rules or STAKE_RULES
+    current_multiplier, threshold = 1.0, r["threshold"]
 
-def get_smart_stake(league_key):
-    current_multiplier, threshold, history_profit = 1.0, 1.035, 0
+    # Zysk ligi z indeksu league_stats.json (O(1) zamiast parsowania całej historii)
+    if index is None:
+        index = load_index()
+    league_profit = index.get(league_key, {}).get('profit', 0)
+    history_profit = league_profit
 
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-                history = json.load(f)
+    if league_profit <= r["loss_limit"]:
+        current_multiplier, threshold = r["loss_multiplier"], r["loss_threshold"]
+    elif league_profit >= r["top_limit"]:
+        current_multiplier = r["top_multiplier"]
+    elif league_profit >= r["good_limit"]:
+        current_multiplier = r["good_multiplier"]
 
-            league_profit = sum(
-                m.get('profit', 0) 
-                for m in history 
-                if m.get('sport') == league_key
-            )
-            history_profit = league_profit
-
-            if league_profit <= -700:
-                current_multiplier, threshold = 0.5, 1.08
-            elif league_profit >= 3000:
-                current_multiplier = 1.6
-            elif league_profit >= 1000:
-                current_multiplier = 1.3
-
-        except:
-            pass
-
-    final_stake = BASE_STAKE * current_multiplier
+    final_stake = r["base_stake"] * current_multiplier
 
     if "icehockey" in league_key.lower():
-        threshold -= 0.01
+        threshold -= r["hockey_discount"]
         if history_profit > 0:
-            final_stake *= 1.25
+            final_stake *= r["hockey_bonus"]
 
     return round(final_stake, 2), round(threshold, 3)
 
-def get_all_keys():
-    keys = []
-    for i in range(1, 11):
-        name = "ODDS_KEY" if i == 1 else f"ODDS_KEY_{i}"
-        val = get_secret(name)
-        if val:
-            keys.append(val)
-    return keys
-
-# ================= MAIN =================
-def main():
-    print(f"🚀 --- START BOT PRO: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---")
-
-    api_keys = get_all_keys()
-    if not api_keys:
-        print("❌ BŁĄD: Brak kluczy API!")
-        return
-
-    try:
-        with open(KEY_STATE_FILE, "r") as f:
-            idx = int(f.read().strip()) % len(api_keys)
-    except:
-        idx = 0
-
-    all_coupons = []
-    if os.path.exists(COUPONS_FILE):
-        try:
-            with open(COUPONS_FILE, "r", encoding="utf-8") as f:
-                all_coupons = json.load(f)
-
-            all_coupons = list({c['id']: c for c in all_coupons}.values())
-
-        except:
-            pass
-
-    already_sent = set(c['id'] for c in all_coupons)
-
-    now = datetime.now(timezone.utc)
+def fetch_league_odds(league, km, recorder=None):
+    """Pobiera kursy jednej ligi przez klucz z największym zapasem limitu."""
+    log = []
+    params = {"regions": "eu", "markets": "h2h", "oddsFormat": "decimal"}
+    with metrics.span("fetch", league):
+        resp, name = odds_request(km, f"sports/{league}/odds", params, log=log)
+
+    if resp is None:
+        return None, log
+    if resp.status_code == 200:
+        if name == "cache":
+            log.append("  💾 Kursy z cache (bez zużycia limitu)")
+        else:
+            log.append(f"  📡 {name}... OK! (pozostało: {km.budget(name)})")
+        with metrics.span("parse", league):
+            data = resp.json()
+        metrics.count("cache_hits" if name == "cache" else "api_calls", league=league)
+        if recorder and name != "cache":
+            recorder.record(league, data)
+        return data, log
+    if resp.status_code == 404:
+        log.append(f"  📡 {name}... Brak meczów (404)")
+    else:
+        log.append(f"  📡 {name}... Błąd {resp.status_code}")
+    return None, log
+
+def scan_leagues(km, workers=SCAN_WORKERS, recorder=None, leagues=None):
+    """Równoległe pobieranie kursów. Wyniki zwracane w kolejności SPORTS_CONFIG."""
+    leagues = list(SPORTS_CONFIG) if leagues is None else leagues
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(lambda l: fetch_league_odds(l, km, recorder), leagues))
+
+    return dict(zip(leagues, results))
+
+def league_tips(league, data, already_sent, league_index, now):
+    """Nowe typy z odpowiedzi /odds jednej ligi: [(kupon, wiadomość Telegram), ...].
+
+    already_sent: id meczów z typem (CouponStore albo zbiór) - nowe kupony dodaje wywołujący.
+    """
+    flag = SPORTS_CONFIG.get(league, "")
     max_future = now + timedelta(hours=48)
-    new_bets_count = 0
+    tips = []
+    picked = set()          # ten sam mecz dwa razy w jednej odpowiedzi
 
-    for league, flag in SPORTS_CONFIG.items():
-        print(f"\n🔍 Skanowanie: {flag} {league.upper()}...")
-        stake, threshold = get_smart_stake(league)
-        data = None
-
-        for _ in range(len(api_keys)):
-            url = f"https://api.the-odds-api.com/v4/sports/{league}/odds"
-            params = {
-                "apiKey": api_keys[idx],
-                "regions": "eu",
-                "markets": "h2h",
-                "oddsFormat": "decimal"
-            }
+    stake, threshold = get_smart_stake(league, league_index)
+    print(f"  📈 Znaleziono {len(data)} meczów.")
+    metrics.count("events", len(data), league)
 
-            try:
-                print(f"  📡 Klucz API #{idx+1}...", end=" ")
-                resp = requests.get(url, params=params, timeout=15)
-
-                if resp.status_code == 200:
-                    data = resp.json()
-                    print("OK!")
-                    break
-                elif resp.status_code == 404:
-                    print("Brak meczów (404)")
-                    break
-                elif resp.status_code == 429:
-                    print("Limit klucza (429)")
-                    idx = (idx + 1) % len(api_keys)
-                else:
-                    print(f"Błąd {resp.status_code}")
-                    idx = (idx + 1) % len(api_keys)
-
-            except Exception as e:
-                print(f"Błąd połączenia: {e}")
-                idx = (idx + 1) % len(api_keys)
+    candidates = []
+    for event in data:
 
-        if not data:
+        if event['id'] in already_sent:
             continue
 
-        print(f"  📈 Znaleziono {len(data)} meczów.")
-
-        for event in data:
-
-            if event['id'] in already_sent:
-                continue
-
-            try:
-                m_time = datetime.fromisoformat(
-                    event['commence_time'].replace("Z", "+00:00")
-                )
-                if not (now < m_time < max_future):
-                    continue
-                m_display = m_time.astimezone(timezone(timedelta(hours=1)))
-            except:
+        try:
+            m_time = datetime.fromisoformat(
+                event['commence_time'].replace("Z", "+00:00")
+            )
+            if not (now < m_time < max_future):
                 continue
+            m_display = m_time.astimezone(timezone(timedelta(hours=1)))
+        except:
+            continue
 
-            prices = {}
-            for bookie in event.get('bookmakers', []):
-                for market in bookie.get('markets', []):
-                    if market['key'] == 'h2h':
-                        for out in market['outcomes']:
-                            prices.setdefault(out['name'], []).append(out['price'])
-
-            best_name, best_odd, best_edge = None, 0, 0
+        candidates.append((event, m_display))
 
-            for name, p_list in prices.items():
-                if name.lower() == "draw" or len(p_list) < 3:
-                    continue
+    # Value per mecz pętlą - przy kilkudziesięciu meczach ligi szybsze niż pakowanie
+    # do tablic numpy (bench_value.py); evaluate_events zostaje dla backtestu
+    with metrics.span("value", league):
+        picks = [best_value_loop(event, threshold) for event, _ in candidates]
 
-                max_odd = max(p_list)
+    for (event, m_display), pick in zip(candidates, picks):
 
-                market_probs = [1/x for x in p_list]
-                fair_prob = sum(market_probs) / len(market_probs)
+        if event['id'] in picked:
+            continue
 
-                your_prob = 1 / max_odd
+        if pick:
+            best_name, best_odd, best_edge = pick
+
+            l_name = league.upper() \
+                .replace("SOCCER_", "") \
+                .replace("ICEHOCKEY_", "") \
+                .replace("_", " ")
+
+            print(f"  🎯 TYP! {event['home_team']} - {best_name} @{best_odd}")
+
+            msg = (
+                f"{'🏒' if 'ice' in league else '⚽'} {flag} <b>{l_name}</b>\n"
+                f"━━━━━━━━━━━━━━━\n"
+                f"🏟 <b>{event['home_team']}</b> vs <b>{event['away_team']}</b>\n"
+                f"⏰ Start: {m_display.strftime('%d.%m | %H:%M')}\n\n"
+                f"✅ Typ: <b>{best_name}</b>\n"
+                f"📈 Kurs: <b>{best_odd}</b>\n"
+                f"💰 Stawka: <b>{stake} PLN</b>\n"
+                f"📊 Value: <b>+{round(best_edge*100, 1)}%</b>\n"
+                f"━━━━━━━━━━━━━━━"
+            )
 
-                edge = (fair_prob - your_prob) / your_prob
+            coupon = {
+                "id": event['id'],
+                "home": event['home_team'],
+                "away": event['away_team'],
+                "outcome": best_name,
+                "odds": best_odd,
+                "stake": stake,
+                "sport": league,
+                "time": event['commence_time']
+            }
 
-                if 1.80 <= max_odd <= 4.50 and edge > (threshold - 1):
-                    if edge > best_edge:
-                        best_edge = edge
-                        best_odd = max_odd
-                        best_name = name
+            tips.append((coupon, msg))
+            picked.add(event['id'])
 
-            if best_name:
+    return tips
 
-                l_name = league.upper() \
-                    .replace("SOCCER_", "") \
-                    .replace("ICEHOCKEY_", "") \
-                    .replace("_", " ")
+# ================= MAIN =================
+def main(km=None, repo=None, league_index=None):
+    """Skan lig i wysyłka typów. pipeline.py podaje wspólne km/repo/indeks lig
+    - wtedy stan kluczy, cache i kupony zapisuje on sam, raz na końcu przebiegu."""
+    print(f"🚀 --- START BOT PRO: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---")
+    standalone = km is None
+    if standalone:
+        metrics.reset("start")
+        km = KeyManager()
+    if not km.keys:
+        print("❌ BŁĄD: Brak kluczy API!")
+        return
 
-                print(f"  🎯 TYP! {event['home_team']} - {best_name} @{best_odd}")
+    repo = repo or get_repository()
+    with metrics.span("load"):
+        # Indeks po id (czy typ już wysłany) i po czasie meczu; duplikaty id scalone
+        store = CouponStore(repo.load_coupons())
+        if league_index is None:
+            league_index = load_index()
+    now = datetime.now(timezone.utc)
+    # Kupony poza oknem /scores do archiwum - coupons.json trzyma tylko żywe
+    expired = store.expire(now)
+    metrics.count("expired", expired)
+    # Wysyłka Telegram w tle - skan nie czeka na odpowiedzi Telegrama
+    outbox = Outbox().start()
 
-                msg = (
-                    f"{'🏒' if 'ice' in league else '⚽'} {flag} <b>{l_name}</b>\n"
-                    f"━━━━━━━━━━━━━━━\n"
-                    f"🏟 <b>{event['home_team']}</b> vs <b>{event['away_team']}</b>\n"
-                    f"⏰ Start: {m_display.strftime('%d.%m | %H:%M')}\n\n"
-                    f"✅ Typ: <b>{best_name}</b>\n"
-                    f"📈 Kurs: <b>{best_odd}</b>\n"
-                    f"💰 Stawka: <b>{stake} PLN</b>\n"
-                    f"📊 Value: <b>+{round(best_edge*100, 1)}%</b>\n"
-                    f"━━━━━━━━━━━━━━━"
-                )
+    new_bets_count = 0
 
-                send_telegram(msg)
+    # Terminarz: /odds tylko dla lig z meczami do zagrania w oknie 48h
+    calendar = FixtureCalendar() if SCHEDULER_ENABLED else None
+    with metrics.span("schedule"):
+        skipped = calendar.plan(list(SPORTS_CONFIG), store, km, now) if calendar else {}
+    to_scan = [league for league in SPORTS_CONFIG if league not in skipped]
 
-                coupon = {
-                    "id": event['id'],
-                    "home": event['home_team'],
-                    "away": event['away_team'],
-                    "outcome": best_name,
-                    "odds": best_odd,
-                    "stake": stake,
-                    "sport": league,
-                    "time": event['commence_time']
-                }
+    print(f"⚡ Równoległe skanowanie {len(to_scan)}/{len(SPORTS_CONFIG)} lig (wątki: {SCAN_WORKERS})...")
+    # Surowe odpowiedzi /odds idą do archiwum (zapis w tle)
+    recorder = get_recorder()
+    with metrics.span("scan"):
+        scanned = scan_leagues(km, recorder=recorder, leagues=to_scan)
 
-                all_coupons.append(coupon)
-                already_sent.add(event['id'])
-                new_bets_count += 1
+    # Przetwarzanie sekwencyjne - ta sama kolejność kuponów co wcześniej
+    for league, flag in SPORTS_CONFIG.items():
+        print(f"\n🔍 Skanowanie: {flag} {league.upper()}...")
+        if league in skipped:
+            print(f"  ⏭ Pominięta: {skipped[league]}")
+            metrics.count("skipped", league=league)
+            continue
+        data, log = scanned[league]
+        for line in log:
+            print(line)
+        if calendar and data is not None:
+            calendar.record_odds(league, data, now)
 
-    with open(KEY_STATE_FILE, "w") as f:
-        f.write(str(idx))
+        if not data:
+            continue
 
-    with open(COUPONS_FILE, "w", encoding="utf-8") as f:
-        json.dump(all_coupons, f, indent=4)
+        for coupon, msg in league_tips(league, data, store, league_index, now):
+            outbox.add(msg, key=f"tip:{coupon['id']}", group=league)
+            store.add(coupon)
+            new_bets_count += 1
+            metrics.count("tips", league=league)
+
+        outbox.release(league)
+
+    if standalone:
+        with metrics.span("save"):
+            km.save()
+            response_cache.save()
+    # Kupony najpierw - wysłanych typów nie może zgubić błąd przy Telegramie czy archiwum
+    with metrics.span("save"):
+        repo.save_coupons(store.coupons())
+        if calendar:
+            calendar.save()
+
+    # Czekanie na dosłanie wiadomości i zapis archiwum kursów
+    with metrics.span("telegram"):
+        print(outbox.close())
+    if recorder:
+        with metrics.span("archive"):
+            print(recorder.close())
+    if standalone:
+        print(http_client.latency_summary())
 
     print(f"\n✅ KONIEC. Nowych typów: {new_bets_count}")
+    if standalone:
+        print(metrics.write())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import metrics
+from datetime import datetime, timezone
+from history_store import atomic_write_json
+from storage import get_repository
+
+# Przyrostowe liczniki statystyk - każdy przebieg przetwarza tylko nowe rozliczenia
+CHECKPOINT_FILE = "stats_checkpoint.json"
+CHECKPOINT_VERSION = 2
+STATS_FILE = "stats.json"       # dane dashboardu (index.html)
+DAY = 24 * 3600
+BASE_CAPITAL = 5000.0
+GRAPH_POINTS = 100
+TAIL_RECORDS = 10
+
+def _parse_time(t_str):
+    try:
+        return datetime.fromisoformat(t_str.replace("Z", "+00:00"))
+    except:
+        return None
+
+def empty_checkpoint(generation=0):
+    return {
+        "version": CHECKPOINT_VERSION,
+        "generation": generation,
+        "count": 0,
+        "profit": 0.0,
+        "staked": 0.0,           # obrót = stawki rozliczonych zakładów (WIN/LOSS)
+        "wins": 0,
+        "losses": 0,
+        "graph_tail": [BASE_CAPITAL],
+        "recent": [],            # [timestamp, zysk] z ostatnich 24h
+        "monthly": {},
+        "daily": {},
+        "leagues": {},
+        "tail": [],              # ostatnie rekordy w kolejności dopisania
+        "updated": None,
+    }
+
+def load_checkpoint():
+    if os.path.exists(CHECKPOINT_FILE):
+        try:
+            with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+                cp = json.load(f)
+            if cp.get("version") == CHECKPOINT_VERSION:
+                return cp
+        except:
+            pass
+    return None
+
+def graph_order(records):
+    """Kolejność punktów krzywej kapitału - publish.py podpisuje wykres tą samą kolejnością."""
+    return sorted(records, key=lambda x: x.get('time', ''))
+
+def apply_records(cp, records, now):
+    """Dolicza rekordy do checkpointu (w miejscu) - jeden przebieg, czas parsowany raz na rekord."""
+    equity = BASE_CAPITAL + cp["profit"]
+    graph = cp["graph_tail"]
+    since = now.timestamp() - DAY
+
+    # Krzywa kapitału w kolejności czasu meczu (jak dotychczas w settle.py)
+    for m in graph_order(records):
+        p = float(m.get('profit') or 0)
+        status = m.get('status')
+
+        cp["profit"] += p
+        equity += p
+        graph.append(round(equity, 2))
+
+        if status == 'WIN':
+            cp["wins"] += 1
+        elif status == 'LOSS':
+            cp["losses"] += 1
+        if status in ('WIN', 'LOSS'):
+            cp["staked"] += float(m.get('stake') or m.get('stawka') or 0)
+
+        t_str = m.get('time') or ''
+        if t_str:
+            cp["monthly"][t_str[:7]] = round(cp["monthly"].get(t_str[:7], 0) + p, 2)
+            cp["daily"][t_str[:10]] = round(cp["daily"].get(t_str[:10], 0) + p, 2)
+            m_time = _parse_time(t_str)
+            # Czas bez strefy (stare depozyty) - poza oknem 24h jak wcześniej
+            if m_time and m_time.tzinfo is not None and m_time.timestamp() > since:
+                cp["recent"].append([m_time.timestamp(), p])
+
+        sport = m.get('sport') or 'Inne'
+        cp["leagues"][sport] = round(cp["leagues"].get(sport, 0) + p, 2)
+
+    cp["graph_tail"] = graph[-(GRAPH_POINTS + 1):]
+    cp["count"] += len(records)
+    cp["tail"] = (cp["tail"] + list(records))[-TAIL_RECORDS:]
+    return cp
+
+def profit_last_24h(cp, now):
+    since = now.timestamp() - DAY
+    return sum((p for t, p in cp["recent"] if t > since), 0.0)
+
+def update_stats(full=False, now=None, repo=None):
+    """Aktualizuje checkpoint o rekordy dopisane od ostatniego przebiegu.
+
+    full=True (albo zmiana generacji historii po edycji lub zmiana backendu) = przeliczenie od zera.
+    """
+    now = now or datetime.now(timezone.utc)
+    repo = repo or get_repository()
+    generation = repo.generation()
+    cp = load_checkpoint()
+
+    if full or cp is None or cp.get("generation") != generation or cp.get("backend", "json") != repo.name:
+        cp = empty_checkpoint(generation)
+        cp["backend"] = repo.name
+        new_records = repo.load_history()
+    else:
+        new_records = repo.history_since(cp["count"])
+
+    apply_records(cp, new_records, now)
+    since = now.timestamp() - DAY
+    cp["recent"] = [r for r in cp["recent"] if r[0] > since]
+    cp["updated"] = now.isoformat(timespec="seconds")
+    atomic_write_json(CHECKPOINT_FILE, cp)
+    return cp
+
+class Analytics:
+    """Wspólny wynik statystyk - settle.py, stats.py i full_report.py renderują z niego.
+
+    Jedne definicje dla wszystkich: skuteczność = WIN / (WIN + LOSS),
+    yield = zysk / obrót rozliczonych zakładów.
+    """
+
+    def __init__(self, cp, now):
+        self.now = now
+        self.count = cp["count"]
+        self.profit = cp["profit"]
+        self.staked = cp["staked"]
+        self.wins = cp["wins"]
+        self.losses = cp["losses"]
+        self.settled = self.wins + self.losses
+        self.bankroll = BASE_CAPITAL + self.profit
+        self.accuracy = self.wins / self.settled * 100 if self.settled else 0.0
+        self.yield_pct = self.profit / self.staked * 100 if self.staked else 0.0
+        self.profit_24h = profit_last_24h(cp, now)
+        self.equity = cp["graph_tail"][-GRAPH_POINTS:]
+        self.monthly = cp["monthly"]
+        self.daily = cp["daily"]
+        self.leagues = cp["leagues"]
+        self.recent = cp["tail"]
+
+    def profit_on(self, day):
+        return self.daily.get(day.strftime("%Y-%m-%d"), 0.0)
+
+    def stats_json(self, upcoming):
+        return {
+            "bankroll": round(self.bankroll, 2),
+            "zysk_total": round(self.profit, 2),
+            "zysk_24h": round(self.profit_24h, 2),
+            "obrot": round(self.staked, 2),
+            "yield": round(self.yield_pct, 2),
+            "accuracy": round(self.accuracy, 1),
+            "total_matches": self.settled,
+            "last_sync": self.now.strftime("%d.%m.%Y %H:%M"),
+            "upcoming_val": upcoming,
+            "history_graph": self.equity,
+        }
+
+def analyze(full=False, now=None, repo=None, columnar=False):
+    """Aktualizuje liczniki (tylko nowe rekordy) i zwraca Analytics.
+
+    columnar=True - raporty z kolumnowej kopii historii (history_columns, wymaga pandas).
+    """
+    now = now or datetime.now(timezone.utc)
+    if columnar:
+        import history_columns
+        if full:
+            history_columns.update_columns(full=True, repo=repo)
+        return history_columns.analyze(now=now, repo=repo)
+    return Analytics(update_stats(full=full, now=now, repo=repo), now)
+
+def write_stats_json(result, upcoming, path=STATS_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result.stats_json(upcoming), f, indent=4)
+    metrics.file_io("write", path)
+
+if __name__ == "__main__":
+    full = len(sys.argv) > 1 and sys.argv[1] == "rebuild"
+    cp = update_stats(full=full)
+    print(f"✅ Statystyki ({'pełne przeliczenie' if full else 'przyrostowo'}): {cp['count']} rekordów, zysk {round(cp['profit'], 2)} PLN")
@@ -0,0 +1,349 @@
+import os
+import sys
+import json
+import sqlite3
+import threading
+import functools
+import metrics
+import history_store
+
+# Wspólny interfejs danych bota: pliki JSON (domyślnie) albo SQLite z indeksami
+# STORAGE=sqlite przełącza skrypty na bazę DB_FILE (import: python storage.py import)
+STORAGE = os.getenv("STORAGE", "json")
+DB_FILE = os.getenv("STORAGE_DB", "bot.db")
+COUPONS_FILE = "coupons.json"
+
+def is_finance(entry):
+    return entry.get('sport') == "FINANCE"
+
+class JsonRepository:
+    """Pliki JSON: historia w partycjach miesięcznych (history/), coupons.json."""
+    name = "json"
+
+    # --- historia ---
+    def has_history(self):
+        return history_store.has_history()
+
+    def load_history(self):
+        return history_store.load_history()
+
+    def history_since(self, offset):
+        return history_store.load_since(offset)
+
+    def history_count(self):
+        return history_store.history_count()
+
+    def append_history(self, entries):
+        history_store.append_history(entries)
+
+    def write_history(self, history, edited=True):
+        history_store.write_history(history, edited=edited)
+
+    def generation(self):
+        return history_store.read_meta().get("generation", 0)
+
+    def league_profit(self, sport):
+        return history_store.league_profit(sport)
+
+    def history_between(self, start, end=None):
+        return history_store.load_between(start, end)
+
+    # --- kupony ---
+    def load_coupons(self):
+        if not os.path.exists(COUPONS_FILE):
+            return []
+        try:
+            metrics.file_io("read", COUPONS_FILE)
+            with open(COUPONS_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except:
+            return []
+
+    def save_coupons(self, coupons):
+        with open(COUPONS_FILE, "w", encoding="utf-8") as f:
+            json.dump(coupons, f, indent=4)
+        metrics.file_io("write", COUPONS_FILE)
+
+    def open_coupons(self, sport=None):
+        return [c for c in self.load_coupons() if sport is None or c.get('sport') == sport]
+
+    def is_sent(self, event_id):
+        return any(c.get('id') == event_id for c in self.load_coupons())
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY, id TEXT, sport TEXT, time TEXT, status TEXT,
+    profit REAL, stake REAL, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS finance (
+    seq INTEGER PRIMARY KEY, id TEXT, time TEXT, status TEXT,
+    profit REAL, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS coupons (
+    seq INTEGER PRIMARY KEY, id TEXT UNIQUE, sport TEXT, time TEXT, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE INDEX IF NOT EXISTS idx_history_id ON history(id);
+CREATE INDEX IF NOT EXISTS idx_history_sport ON history(sport);
+CREATE INDEX IF NOT EXISTS idx_history_time ON history(time);
+CREATE INDEX IF NOT EXISTS idx_history_status ON history(status);
+CREATE INDEX IF NOT EXISTS idx_finance_time ON finance(time);
+CREATE INDEX IF NOT EXISTS idx_finance_status ON finance(status);
+CREATE INDEX IF NOT EXISTS idx_coupons_sport ON coupons(sport);
+CREATE INDEX IF NOT EXISTS idx_coupons_time ON coupons(time);
+"""
+
+# Historia i operacje finansowe mają wspólny licznik seq - razem dają kolejność z history.json
+ALL_HISTORY = "SELECT seq, data FROM history UNION ALL SELECT seq, data FROM finance"
+
+def _locked(method):
+    """Jedno połączenie SQLite współdzielone przez wątki (daemon.py: asyncio.to_thread) - po kolei."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class SqliteRepository:
+    """Te same operacje na bazie SQLite (indeksy po id, sport, time, status)."""
+    name = "sqlite"
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def _meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def _insert_history(self, entries, seq):
+        for entry in entries:
+            seq += 1
+            data = json.dumps(entry, ensure_ascii=False)
+            if is_finance(entry):
+                self.db.execute("INSERT INTO finance VALUES (?, ?, ?, ?, ?, ?)",
+                                (seq, entry.get('id'), entry.get('time'), entry.get('status'),
+                                 float(entry.get('profit') or 0), data))
+            else:
+                self.db.execute("INSERT INTO history VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                (seq, entry.get('id'), entry.get('sport'), entry.get('time'), entry.get('status'),
+                                 float(entry.get('profit') or 0), float(entry.get('stake') or 0), data))
+
+    # --- historia ---
+    @_locked
+    def has_history(self):
+        return self.db.execute(f"SELECT 1 FROM ({ALL_HISTORY}) LIMIT 1").fetchone() is not None
+
+    @_locked
+    def load_history(self):
+        return self.history_since(0)
+
+    @_locked
+    def history_since(self, offset):
+        rows = self.db.execute(f"SELECT data FROM ({ALL_HISTORY}) ORDER BY seq LIMIT -1 OFFSET ?", (offset,))
+        return [json.loads(r[0]) for r in rows]
+
+    @_locked
+    def history_count(self):
+        return self.db.execute(f"SELECT COUNT(*) FROM ({ALL_HISTORY})").fetchone()[0]
+
+    @_locked
+    def append_history(self, entries):
+        if not entries:
+            return
+        with self.db:
+            seq = self.db.execute(f"SELECT COALESCE(MAX(seq), 0) FROM ({ALL_HISTORY})").fetchone()[0]
+            self._insert_history(entries, seq)
+
+    @_locked
+    def write_history(self, history, edited=True):
+        with self.db:
+            self.db.execute("DELETE FROM history")
+            self.db.execute("DELETE FROM finance")
+            self._insert_history(history, 0)
+            if edited:
+                self._set_meta("generation", self.generation() + 1)
+
+    @_locked
+    def generation(self):
+        return self._meta("generation", 0)
+
+    @_locked
+    def league_profit(self, sport):
+        row = self.db.execute("SELECT COALESCE(SUM(profit), 0) FROM history WHERE sport = ?", (sport,)).fetchone()
+        return round(row[0], 2)
+
+    @_locked
+    def history_between(self, start, end=None):
+        where = "WHERE time >= :start AND (:end IS NULL OR time < :end)"
+        sql = f"SELECT seq, data FROM history {where} UNION ALL SELECT seq, data FROM finance {where} ORDER BY seq"
+        return [json.loads(r[1]) for r in self.db.execute(sql, {"start": start, "end": end})]
+
+    # --- kupony ---
+    @_locked
+    def load_coupons(self):
+        return [json.loads(r[0]) for r in self.db.execute("SELECT data FROM coupons ORDER BY seq")]
+
+    @_locked
+    def save_coupons(self, coupons):
+        with self.db:
+            self.db.execute("DELETE FROM coupons")
+            self.db.executemany(
+                "INSERT OR REPLACE INTO coupons (id, sport, time, data) VALUES (?, ?, ?, ?)",
+                [(c.get('id'), c.get('sport'), c.get('time'), json.dumps(c, ensure_ascii=False)) for c in coupons])
+
+    @_locked
+    def open_coupons(self, sport=None):
+        if sport is None:
+            return self.load_coupons()
+        rows = self.db.execute("SELECT data FROM coupons WHERE sport = ? ORDER BY seq", (sport,))
+        return [json.loads(r[0]) for r in rows]
+
+    @_locked
+    def is_sent(self, event_id):
+        return self.db.execute("SELECT 1 FROM coupons WHERE id = ?", (event_id,)).fetchone() is not None
+
+    @_locked
+    def flush(self):
+        pass
+
+    @_locked
+    def close(self):
+        self.db.close()
+
+class CachedRepository:
+    """Dane w pamięci nad dowolnym repozytorium (pipeline.py).
+
+    Historia i kupony są czytane raz i współdzielone przez etapy; dopisane
+    rekordy i zmienione kupony trafiają do bazy/plików dopiero w flush().
+    Zapytania o fragment historii (history_since, league_profit, history_between)
+    idą do bazowego repozytorium (indeksy, manifest) + rekordy jeszcze niezapisane.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.name = base.name
+        self._history = None
+        self._coupons = None
+        self._appended = []
+        self._coupons_dirty = False
+
+    # --- historia ---
+    def has_history(self):
+        return bool(self._appended) or (bool(self._history) if self._history is not None else self.base.has_history())
+
+    def load_history(self):
+        if self._history is None:
+            self._history = self.base.load_history() + self._appended
+        return self._history
+
+    def history_since(self, offset):
+        if self._history is not None:
+            return self._history[offset:]
+        records = self.base.history_since(offset)
+        if records:
+            return records + self._appended
+        return self._appended[max(0, offset - self.base.history_count()):]
+
+    def history_count(self):
+        if self._history is not None:
+            return len(self._history)
+        return self.base.history_count() + len(self._appended)
+
+    def append_history(self, entries):
+        self._appended.extend(entries)
+        if self._history is not None:
+            self._history.extend(entries)
+
+    def write_history(self, history, edited=True):
+        self.flush()
+        self.base.write_history(history, edited=edited)
+        self._history = list(history)
+
+    def generation(self):
+        return self.base.generation()
+
+    def league_profit(self, sport):
+        pending = sum(float(m.get('profit') or 0) for m in self._appended if m.get('sport') == sport)
+        return round(self.base.league_profit(sport) + pending, 2)
+
+    def history_between(self, start, end=None):
+        return self.base.history_between(start, end) + [
+            m for m in self._appended
+            if (m.get('time') or '') >= start and (end is None or (m.get('time') or '') < end)]
+
+    # --- kupony ---
+    def load_coupons(self):
+        if self._coupons is None:
+            self._coupons = self.base.load_coupons()
+        return list(self._coupons)
+
+    def save_coupons(self, coupons):
+        self._coupons = list(coupons)
+        self._coupons_dirty = True
+
+    def open_coupons(self, sport=None):
+        return [c for c in self.load_coupons() if sport is None or c.get('sport') == sport]
+
+    def is_sent(self, event_id):
+        return any(c.get('id') == event_id for c in self.load_coupons())
+
+    def flush(self):
+        if self._appended:
+            self.base.append_history(self._appended)
+            self._appended = []
+        if self._coupons_dirty:
+            self.base.save_coupons(self._coupons)
+            self._coupons_dirty = False
+
+    def close(self):
+        self.flush()
+        self.base.close()
+
+_repo = None
+
+def get_repository(backend=None):
+    """Repozytorium wybrane zmienną STORAGE (json | sqlite)."""
+    global _repo
+    backend = backend or STORAGE
+    if _repo is None or _repo.name != backend:
+        _repo = SqliteRepository() if backend == "sqlite" else JsonRepository()
+    return _repo
+
+def import_json(db_path=DB_FILE):
+    """Jednorazowe przeniesienie historii (history/) i coupons.json do SQLite."""
+    src, dst = JsonRepository(), SqliteRepository(db_path)
+    history, coupons = src.load_history(), src.load_coupons()
+    dst.write_history(history, edited=False)
+    dst.save_coupons(coupons)
+    dst.close()
+    return len(history), len(coupons)
+
+def export_json(db_path=DB_FILE):
+    """Zapisuje dane z SQLite z powrotem do plików JSON (dla dashboardu na GitHub Pages)."""
+    src = SqliteRepository(db_path)
+    history, coupons = src.load_history(), src.load_coupons()
+    src.close()
+    dst = JsonRepository()
+    dst.write_history(history, edited=dst.load_history() != history)
+    dst.save_coupons(coupons)
+    return len(history), len(coupons)
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "import":
+        h, c = import_json()
+        print(f"✅ Zaimportowano do {DB_FILE}: {h} rekordów historii, {c} kuponów")
+    elif cmd == "export":
+        h, c = export_json()
+        print(f"✅ Wyeksportowano z {DB_FILE}: {h} rekordów historii, {c} kuponów")
+    else:
+        print("Użycie: python storage.py [import|export]")
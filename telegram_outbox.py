@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import threading
+import http_client
+from datetime import datetime, timezone, timedelta
+from history_store import atomic_write_json
+
+# Kolejka wiadomości Telegram - wysyłka w tle, limity Telegrama, trwałość w sent.json
+OUTBOX_FILE = "sent.json"
+TELEGRAM_API = os.getenv("TELEGRAM_API", "https://api.telegram.org")
+DIGEST_MODE = os.getenv("TG_DIGEST", "off")         # off | league | run
+CHAT_INTERVAL = float(os.getenv("TG_CHAT_INTERVAL", "1.1"))   # ~1 wiadomość/s na czat
+GLOBAL_INTERVAL = 1 / 25                            # limit bota ~30 wiadomości/s
+MAX_LENGTH = 4096                                   # limit długości wiadomości
+MAX_ATTEMPTS = 5                                    # prób w jednym uruchomieniu
+FLUSH_TIMEOUT = 90                                  # sekund na opróżnienie kolejki
+SENT_KEEP_DAYS = 7                                  # jak długo pamiętamy wysłane klucze
+# 429 obsługujemy sami (retry_after per czat), http_client ponawia tylko błędy serwera
+SERVER_ERRORS = {500, 502, 503, 504}
+
+def get_secret(name):
+    val = os.environ.get(name) or os.getenv(name)
+    return str(val).strip() if val else None
+
+def split_text(parts, header="", limit=MAX_LENGTH):
+    """Skleja fragmenty w wiadomości nie dłuższe niż limit Telegrama."""
+    messages, current, count = [], header, 0
+    for part in parts:
+        sep = "\n\n" if count else ""
+        if count and len(current) + len(sep) + len(part) > limit:
+            messages.append(current)
+            current, sep, count = header, "", 0
+        current += sep + part
+        count += 1
+    if count:
+        messages.append(current)
+    return messages
+
+class Outbox:
+    """Trwała kolejka wiadomości z wątkiem wysyłającym.
+
+    Każda wiadomość ma klucz (np. tip:<id meczu>) - po wysłaniu trafia do
+    "sent" w sent.json, więc ponowne uruchomienie po awarii nie wyśle jej drugi
+    raz, a niewysłane wiadomości z "pending" zostaną dosłane.
+    """
+
+    def __init__(self, path=OUTBOX_FILE, token=None, digest=DIGEST_MODE):
+        self.path = path
+        self.token = token or get_secret("T_TOKEN")
+        self.digest = digest if digest in ("league", "run") else "off"
+        self.cond = threading.Condition()
+        self.pending, self.sent = [], {}
+        self.next_chat = {}          # czat -> najwcześniejszy czas kolejnej wysyłki
+        self.next_global = 0.0
+        self.delivered = self.failed = 0
+        self.thread = None
+        self.stopping = False
+        self._load()
+
+    def _load(self):
+        data = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f) or {}
+            except:
+                data = {}
+        self.pending = data.get("pending", [])
+        self.sent = data.get("sent", {})
+        # Digest przerwany awarią - wstrzymane wiadomości wysyłamy od razu
+        groups = {m["group"] for m in self.pending if m.get("group")}
+        for group in groups:
+            self._release(group)
+        for m in self.pending:
+            m["attempts"] = 0
+        if self.pending:
+            print(f"📨 Outbox: {len(self.pending)} niewysłanych wiadomości z poprzedniego uruchomienia")
+
+    def _save(self):
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=SENT_KEEP_DAYS)).isoformat()
+        self.sent = {k: t for k, t in self.sent.items() if t >= cutoff}
+        atomic_write_json(self.path, {"pending": self.pending, "sent": self.sent})
+
+    def add(self, text, key=None, chat=None, group=None, mode="HTML"):
+        """Dodaje wiadomość do kolejki. Zwraca False, gdy pominięta (brak konfiguracji lub duplikat)."""
+        chat = chat or get_secret("T_CHAT")
+        if not self.token or not chat:
+            return False
+        with self.cond:
+            queued = {k for m in self.pending for k in m["keys"]}
+            if key and (key in self.sent or key in queued):
+                return False
+            if self.digest == "off":
+                group = None
+            elif self.digest == "run":
+                group = "run"
+            self.pending.append({
+                "keys": [key] if key else [], "chat": chat, "text": text, "mode": mode,
+                "group": group, "attempts": 0,
+                "created": datetime.now(timezone.utc).isoformat(),
+            })
+            self._save()
+            self.cond.notify()
+        return True
+
+    def release(self, group):
+        """Zamyka grupę digestu (np. ligę) - jej wiadomości idą jako jedna."""
+        with self.cond:
+            if self._release(group):
+                self._save()
+                self.cond.notify()
+
+    def _release(self, group):
+        held = [m for m in self.pending if m.get("group") == group]
+        if not held:
+            return False
+        self.pending = [m for m in self.pending if m.get("group") != group]
+        by_chat = {}
+        for m in held:
+            by_chat.setdefault((m["chat"], m["mode"]), []).append(m)
+        for (chat, mode), items in by_chat.items():
+            if len(items) == 1:
+                texts = [items[0]["text"]]
+                header = ""
+            else:
+                texts = [m["text"] for m in items]
+                header = f"📬 <b>Nowe typy: {len(items)}</b>\n\n" if mode == "HTML" else ""
+            keys = [k for m in items for k in m["keys"]]
+            for text in split_text(texts, header):
+                # Klucze przypisujemy do każdej części - pierwsza wysłana oznacza całość
+                self.pending.append({"keys": keys, "chat": chat, "text": text, "mode": mode,
+                                     "group": None, "attempts": 0, "created": items[0]["created"]})
+                keys = []
+        return True
+
+    def start(self):
+        if self.thread is None and self.token:
+            self.thread = threading.Thread(target=self._run, name="telegram-outbox", daemon=True)
+            self.thread.start()
+        return self
+
+    def _ready(self, now):
+        for m in self.pending:
+            if m.get("group") or m["attempts"] >= MAX_ATTEMPTS:
+                continue
+            if self.next_chat.get(m["chat"], 0) <= now:
+                return m
+        return None
+
+    def _wait_time(self, now):
+        times = [self.next_chat.get(m["chat"], 0) for m in self.pending
+                 if not m.get("group") and m["attempts"] < MAX_ATTEMPTS]
+        if not times:
+            return None
+        return max(0.0, min(times) - now, self.next_global - now)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while True:
+                    now = time.monotonic()
+                    msg = self._ready(now) if self.next_global <= now else None
+                    if msg:
+                        break
+                    wait = self._wait_time(now)
+                    if wait is None and self.stopping:
+                        return
+                    self.cond.wait(timeout=wait if wait is not None else 1.0)
+                self.next_global = now + GLOBAL_INTERVAL
+                self.next_chat[msg["chat"]] = now + CHAT_INTERVAL
+
+            resp = self._post(msg)
+
+            with self.cond:
+                self._handle(msg, resp)
+                self._save()
+                self.cond.notify_all()
+
+    def _post(self, msg):
+        url = f"{TELEGRAM_API}/bot{self.token}/sendMessage"
+        payload = {"chat_id": msg["chat"], "text": msg["text"], "parse_mode": msg["mode"]}
+        return http_client.post(url, json=payload, retry_statuses=SERVER_ERRORS)
+
+    def _handle(self, msg, resp):
+        status = resp.status_code if resp is not None else None
+        if status == 200:
+            stamp = datetime.now(timezone.utc).isoformat()
+            for key in msg["keys"]:
+                self.sent[key] = stamp
+            self.pending.remove(msg)
+            self.delivered += 1
+            return
+
+        msg["attempts"] += 1
+        if status == 429:
+            wait = http_client._retry_after(resp) or CHAT_INTERVAL * 2
+            self.next_chat[msg["chat"]] = time.monotonic() + wait
+            print(f"  ⏳ Telegram: limit (429), czekam {wait:.1f} s")
+        elif status in (400, 403):
+            # Błąd treści lub brak dostępu do czatu - ponawianie nic nie da
+            self.pending.remove(msg)
+            self.failed += 1
+            print(f"  ⚠️ Telegram: odrzucono wiadomość ({status}) - pomijam")
+        else:
+            self.next_chat[msg["chat"]] = time.monotonic() + http_client._backoff(msg["attempts"])
+            print(f"  ⚠️ Telegram: nie wysłano wiadomości ({status or 'brak połączenia'}), próba {msg['attempts']}/{MAX_ATTEMPTS}")
+
+    def close(self, timeout=FLUSH_TIMEOUT):
+        """Zwalnia wszystkie grupy, czeka na wysyłkę i zapisuje stan kolejki."""
+        with self.cond:
+            for group in {m["group"] for m in self.pending if m.get("group")}:
+                self._release(group)
+            self.stopping = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        with self.cond:
+            self._save()
+            left = len(self.pending)
+        return self.summary(left)
+
+    def summary(self, left=None):
+        left = len(self.pending) if left is None else left
+        msg = f"📨 Telegram: wysłano {self.delivered}"
+        if self.failed:
+            msg += f", odrzucono {self.failed}"
+        if left:
+            msg += f", w kolejce na następne uruchomienie {left}"
+        return msg
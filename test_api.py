@@ -1,32 +1,34 @@
-import os
-import requests
+import http_client
+from api_keys import KeyManager, ODDS_API_URL
 
 def test_keys():
-    # Dynamiczne generowanie listy kluczy do sprawdzenia (1-10)
-    print("🔍 ROZPOCZYNAM TEST 10 KLUCZY API...\n")
+    # Sprawdzamy wszystkie klucze z puli (ODDS_KEY, ODDS_KEY_1 ... ODDS_KEY_10)
+    print("🔍 ROZPOCZYNAM TEST KLUCZY API...\n")
     print(f"{'NAZWA SEKRETU':<15} | {'STATUS':<10} | {'POZOSTAŁO'} | {'ZUŻYTO'}")
     print("-" * 65)
 
-    for i in range(1, 11):
-        # Obsługa nazw ODDS_KEY_1, ODDS_KEY_2 itd.
-        name = f"ODDS_KEY_{i}"
-        key = os.getenv(name)
-        
-        # Opcjonalna obsługa Twojego pierwszego klucza, jeśli nie ma numerka
-        if i == 1 and not key:
-            key = os.getenv("ODDS_KEY")
-            name = "ODDS_KEY"
+    km = KeyManager()
+    if not km.keys:
+        print("⚪ BRAK kluczy w zmiennych środowiskowych.")
+
+    for name in km.keys:
+        entry = km.state[name]
 
-        if not key:
-            print(f"{name:<15} | ⚪ BRAK      | ---         | ---")
+        # Klucz znany jako wyczerpany - nie marnujemy na niego zapytania
+        if not km.is_available(name):
+            remaining = str(entry.get('remaining') if entry.get('remaining') is not None else '?')
+            print(f"{name:<15} | ⚠️ LIMIT     | {remaining:<11} | {entry.get('used')} (ze stanu)")
             continue
         
         # Zapytanie o listę sportów (lekki endpoint do testu)
-        url = "https://api.the-odds-api.com/v4/sports/"
-        params = {"apiKey": key}
+        url = f"{ODDS_API_URL}/sports/"
+        params = {"apiKey": km.key(name)}
         
         try:
-            resp = requests.get(url, params=params)
+            resp = http_client.get(url, params=params, retries=0)
+            if resp is None:
+                raise ConnectionError(name)
+            km.report(name, resp)
             
             # Pobieranie danych o limitach z nagłówków
             remaining = resp.headers.get('x-requests-remaining', '0')
@@ -36,16 +38,17 @@ def test_keys():
             if resp.status_code == 200:
                 print(f"{name:<15} | ✅ OK        | {remaining:<11} | {used}/{quota}")
             elif resp.status_code == 401:
-                print(f"{name:<15} | ❌ BŁĄD      | Unauthorized (Zły klucz)")
+                print(f"{name:<15} | ❌ BŁĄD      | Unauthorized (Zły klucz / brak kredytów)")
             elif resp.status_code == 429:
                 print(f"{name:<15} | ⚠️ LIMIT     | 0           | {used}/{quota} (FULL)")
             else:
                 print(f"{name:<15} | ❓ STATUS {resp.status_code}")
                 
-        except Exception as e:
+        except Exception:
             print(f"{name:<15} | ❌ ERROR     | Błąd połączenia")
 
-    print("\n💡 Wskazówka: Jeśli widzisz 'BRAK', sprawdź czy klucze są dodane do Secrets/Environment Variables.")
+    km.save()
+    print("\n💡 Wskazówka: Jeśli brakuje klucza, sprawdź czy jest dodany do Secrets/Environment Variables.")
 
 if __name__ == "__main__":
     test_keys()
@@ -0,0 +1,138 @@
+import numpy as np
+
+# Zakres kursów i minimalna liczba bukmacherów dla typu
+MIN_ODDS = 1.80
+MAX_ODDS = 4.50
+MIN_BOOKMAKERS = 3
+
+def collect_prices(event):
+    """Kursy h2h per wynik, w kolejności występowania u bukmacherów."""
+    prices = {}
+    for bookie in event.get('bookmakers', []):
+        for market in bookie.get('markets', []):
+            if market['key'] == 'h2h':
+                for out in market['outcomes']:
+                    prices.setdefault(out['name'], []).append(out['price'])
+    return prices
+
+def best_value_loop(event, threshold):
+    """Najlepszy value w meczu (pętle w Pythonie) - używany przez start.py przy skanie ligi."""
+    best_name, best_odd, best_edge = None, 0, 0
+
+    for name, p_list in collect_prices(event).items():
+        if name.lower() == "draw" or len(p_list) < MIN_BOOKMAKERS:
+            continue
+
+        max_odd = max(p_list)
+
+        market_probs = [1/x for x in p_list]
+        fair_prob = sum(market_probs) / len(market_probs)
+
+        your_prob = 1 / max_odd
+
+        edge = (fair_prob - your_prob) / your_prob
+
+        if MIN_ODDS <= max_odd <= MAX_ODDS and edge > (threshold - 1):
+            if edge > best_edge:
+                best_edge = edge
+                best_odd = max_odd
+                best_name = name
+
+    return (best_name, best_odd, best_edge) if best_name else None
+
+def pack_events(events):
+    """Pakuje odpowiedź ligi do płaskich tablic (jedna pozycja = jeden kurs).
+
+    Każda para (mecz, wynik) dostaje kolejny numer grupy; grupy jednego meczu
+    są ułożone obok siebie, w kolejności pierwszego wystąpienia wyniku.
+    """
+    group_of_price, prices = [], []
+    group_event, group_name = [], []
+    add_group, add_price = group_of_price.append, prices.append
+
+    for i, event in enumerate(events):
+        slots = {}
+        for bookie in event.get('bookmakers', []):
+            for market in bookie.get('markets', []):
+                if market['key'] == 'h2h':
+                    for out in market['outcomes']:
+                        name = out['name']
+                        g = slots.get(name)
+                        if g is None:
+                            g = slots[name] = len(group_name)
+                            group_event.append(i)
+                            group_name.append(name)
+                        add_group(g)
+                        add_price(out['price'])
+
+    return group_of_price, prices, group_event, group_name
+
+def evaluate_events(events, threshold, min_odds=MIN_ODDS, max_odds=MAX_ODDS, min_bookmakers=MIN_BOOKMAKERS):
+    """Wyszukuje value dla całej ligi naraz.
+
+    Zwraca listę (nazwa, kurs, edge) albo None - w kolejności `events`.
+    Zgodne z best_value_loop z dokładnością do zaokrągleń: bincount sumuje
+    po kolei, a sum() od Pythona 3.12 kompensuje błąd (edge różni się
+    o ~1e-16, przy edge równym progu wybór może się różnić).
+    """
+    return evaluate_packed(pack_events(events), len(events), threshold, min_odds, max_odds, min_bookmakers)
+
+def group_stats(packed):
+    """Statystyki każdej grupy (mecz, wynik): liczba kursów, kurs max, edge.
+
+    Nie zależą od progu ani zakresu kursów - backtest liczy je raz na odpowiedź.
+    """
+    group_list, price_list, group_event, group_name = packed
+    n_groups = len(group_name)
+    group_of_price = np.array(group_list, dtype=np.int64)
+    prices = np.array(price_list, dtype=float)
+
+    count = np.bincount(group_of_price, minlength=n_groups)
+    total = np.bincount(group_of_price, weights=1 / prices, minlength=n_groups)
+    max_odd = np.full(n_groups, -np.inf)
+    np.maximum.at(max_odd, group_of_price, prices)
+
+    fair_prob = total / count
+    your_prob = 1 / max_odd
+    return {
+        "group_of_price": group_of_price,
+        "prices": prices,
+        "group_event": np.array(group_event, dtype=np.int64),
+        "count": count,
+        "max_odd": max_odd,
+        "edge": (fair_prob - your_prob) / your_prob,
+        "playable": np.array([name.lower() != "draw" for name in group_name], dtype=bool),
+    }
+
+def evaluate_packed(packed, n_events, threshold, min_odds=MIN_ODDS, max_odds=MAX_ODDS, min_bookmakers=MIN_BOOKMAKERS):
+    """Część obliczeniowa evaluate_events na gotowym wyniku pack_events."""
+    picks = [None] * n_events
+    _, price_list, _, group_name = packed
+    if not group_name:
+        return picks
+    st = group_stats(packed)
+    group_of_price, prices, group_event = st["group_of_price"], st["prices"], st["group_event"]
+    max_odd, edge = st["max_odd"], st["edge"]
+
+    ok = (st["playable"] & (st["count"] >= min_bookmakers)
+          & (max_odd >= min_odds) & (max_odd <= max_odds)
+          & (edge > threshold - 1) & (edge > 0))
+    if not ok.any():
+        return picks
+
+    # Najlepszy wynik w meczu; przy remisie pierwszy (jak ścisłe ">" w pętli)
+    cand = np.flatnonzero(ok)
+    best_edge = np.full(n_events, -np.inf)
+    np.maximum.at(best_edge, group_event[cand], edge[cand])
+    winners = cand[edge[cand] == best_edge[group_event[cand]]]
+    events_won, first = np.unique(group_event[winners], return_index=True)
+
+    # Pozycja pierwszego maksymalnego kursu w grupie - kurs oddajemy jako oryginalną
+    # wartość z API (np. int 2 zostaje 2, tak jak max() w pętli)
+    at_max = np.flatnonzero(prices == max_odd[group_of_price])
+    groups_at_max, first_max = np.unique(group_of_price[at_max], return_index=True)
+    max_pos = dict(zip(groups_at_max.tolist(), at_max[first_max].tolist()))
+
+    for i, g in zip(events_won.tolist(), winners[first].tolist()):
+        picks[i] = (group_name[g], price_list[max_pos[g]], float(edge[g]))
+    return picks
@@ -1,17 +1,13 @@
-import json
-import os
 from datetime import datetime, timezone
-
-HISTORY_FILE = "history.json"
+from league_index import update_index
+from storage import get_repository
 
 def add_withdrawal(amount, note="Wypłata"):
-    if not os.path.exists(HISTORY_FILE):
+    repo = get_repository()
+    if not repo.has_history():
         print("❌ Brak pliku historii!")
         return
     
-    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-        history = json.load(f)
-    
     # Tworzymy wpis o wypłacie
     entry = {
         "id": f"wd-{int(datetime.now().timestamp())}",
@@ -27,10 +23,8 @@ def add_withdrawal(amount, note="Wypłata"):
         "time": datetime.now(timezone.utc).isoformat()
     }
     
-    history.append(entry)
-    
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=4)
+    repo.append_history([entry])
+    update_index([entry])
     
     print(f"✅ Pomyślnie zarejestrowano wypłatę: {amount} PLN")
 